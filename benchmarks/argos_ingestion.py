@@ -0,0 +1,88 @@
+"""Measure the ARGoS pulse ingestion throughput, in pulses per second.
+
+Usage: python -m benchmarks.argos_ingestion [nDrones] [nTicks]
+"""
+import json
+import socket
+import sys
+import time
+from io import StringIO
+from threading import Thread
+
+from src.utils.receive_buffer import ReceiveBuffer
+
+
+def makePulse(index: int, tick: int) -> bytes:
+    """Build a json pulse line like the ones sent by ARGoS.
+
+      @param index: the index of the simulated drone.
+      @param tick: the simulation tick.
+    """
+    return bytes(json.dumps({
+        'type': 'pulse',
+        'data': {
+            'name': f's{index}',
+            'timestamp': tick,
+            'speed': 0.25,
+            'battery': 87.5,
+            'position': [index * 0.1, tick * 0.01, 0.3],
+            'yaw': 0.785,
+            'ranges': [127, 2540, 65530, 300],
+            'state': 'exploring',
+            'ledOn': False,
+        }
+    }) + '\n', 'ascii')
+
+
+def sendAll(clientSocket: socket.socket, payload: bytes) -> None:
+    clientSocket.sendall(payload)
+    clientSocket.shutdown(socket.SHUT_WR)
+
+
+def receiveFramed(serverSocket: socket.socket) -> int:
+    receiveBuffer = ReceiveBuffer()
+    nPulses = 0
+    while receiveBuffer.recvFrom(serverSocket):
+        for line in receiveBuffer.popLines():
+            json.loads(line)
+            nPulses += 1
+    return nPulses
+
+
+def receiveLegacy(serverSocket: socket.socket) -> int:
+    nPulses = 0
+    while True:
+        message = serverSocket.recv(2048)
+        if message == b'':
+            return nPulses
+        try:
+            lines = list(filter(lambda x: x, message.decode().split('\n')))
+            nPulses += len(list(map(lambda x: json.load(StringIO(x)), lines)))
+        except ValueError:
+            pass
+
+
+def run(receive, payload: bytes):
+    serverSocket, clientSocket = socket.socketpair()
+    sender = Thread(target=sendAll, args=(clientSocket, payload))
+    start = time.perf_counter()
+    sender.start()
+    nPulses = receive(serverSocket)
+    elapsed = time.perf_counter() - start
+    sender.join()
+    serverSocket.close()
+    clientSocket.close()
+    return nPulses, elapsed
+
+
+if __name__ == '__main__':
+    nDrones = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    nTicks = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    payload = b''.join(makePulse(i, t)
+                       for t in range(nTicks) for i in range(nDrones))
+    nSent = nDrones * nTicks
+    for name, receive in (('legacy', receiveLegacy),
+                          ('framed', receiveFramed)):
+        nPulses, elapsed = run(receive, payload)
+        print(f'{name:>8}: {nPulses}/{nSent} pulses parsed, '
+              f'{nPulses / elapsed:,.0f} pulses/s')
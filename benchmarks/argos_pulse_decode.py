@@ -0,0 +1,61 @@
+"""Compare the decoding cost of json and binary ARGoS pulses.
+
+Usage: python -m benchmarks.argos_pulse_decode [nDrones] [nTicks]
+"""
+import json
+import sys
+import time
+
+from src.models.argos_packet import (PULSE_STRUCT, PULSES_HEADER_STRUCT,
+                                     decodePulses, encodePulses)
+from src.models.drone import Drone
+from src.utils.receive_buffer import ReceiveBuffer
+
+
+def makeDrone(index: int, tick: int) -> Drone:
+    return Drone(
+        name=f's{index}',
+        timestamp=tick,
+        speed=0.25,
+        battery=87.5,
+        position=[index * 0.1, tick * 0.01, 0.3],
+        yaw=0.785,
+        ranges=[127, 2540, 65530, 300],
+        state='exploring',
+        ledOn=False
+    )  # noqa
+
+
+def decodeJson(receiveBuffer: ReceiveBuffer, tick: bytes) -> int:
+    receiveBuffer.feed(tick)
+    return len([json.loads(line) for line in receiveBuffer.popLines()])
+
+
+def decodeBinary(receiveBuffer: ReceiveBuffer, tick: bytes) -> int:
+    receiveBuffer.feed(tick)
+    (code, count) = PULSES_HEADER_STRUCT.unpack(
+        receiveBuffer.peek(PULSES_HEADER_STRUCT.size))
+    frame = receiveBuffer.popFrame(
+        PULSES_HEADER_STRUCT.size + count * PULSE_STRUCT.size)
+    return len(list(decodePulses(frame[PULSES_HEADER_STRUCT.size:])))
+
+
+if __name__ == '__main__':
+    nDrones = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    nTicks = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    drones = [makeDrone(i, 1) for i in range(nDrones)]
+    jsonTick = b''.join(
+        bytes(json.dumps({'type': 'pulse', 'data': d}) + '\n', 'ascii')
+        for d in drones)
+    binaryTick = encodePulses(drones)
+
+    for name, decode, tick in (('json', decodeJson, jsonTick),
+                               ('binary', decodeBinary, binaryTick)):
+        receiveBuffer = ReceiveBuffer()
+        start = time.perf_counter()
+        for _ in range(nTicks):
+            decode(receiveBuffer, tick)
+        elapsed = time.perf_counter() - start
+        print(f'{name:>6}: {len(tick):5d} bytes/tick, '
+              f'{elapsed / nTicks * 1e6:8.1f} us/tick, '
+              f'{nDrones * nTicks / elapsed:,.0f} pulses/s')
@@ -0,0 +1,125 @@
+"""Measure the end to end pulse throughput, from an ARGoS simulation to a
+dashboard, with the controllers running as threads or as processes.
+
+Usage: python -m benchmarks.controller_processes [mode] [nDrones] [nTicks]
+"""
+import asyncio
+import json
+import socket
+import sys
+import threading
+import time
+
+import websockets
+from benchmarks.argos_ingestion import makePulse
+from src.controllers.argos_controller import ArgosController
+from src.controllers.dashboard_controller import DashboardController
+from src.models.message import Message
+from src.services.communications import CommunicationService
+from src.services.controller_processes import ControllerProcesses
+
+ARGOS_PORT = 3999
+DASHBOARD_PORT = 5098
+IDLE_TIMEOUT = 3
+
+
+class FakeRadioController:
+    stopped = threading.Event()
+
+    @staticmethod
+    def launch() -> threading.Thread:
+        thread = threading.Thread(target=FakeRadioController.stopped.wait)
+        thread.start()
+        return thread
+
+    @staticmethod
+    def stopServer() -> None:
+        FakeRadioController.stopped.set()
+
+    @staticmethod
+    def getCurrentMission() -> None:
+        return None
+
+    @staticmethod
+    def onControllerReceivedMessage(message: Message) -> None:
+        pass
+
+
+def sendPulses(payload: bytes) -> None:
+    simulation = socket.create_connection(('localhost', ARGOS_PORT))
+    simulation.sendall(payload)
+    # Keep the simulation connected until its drones were received
+    time.sleep(IDLE_TIMEOUT * 2)
+    simulation.close()
+
+
+async def receivePulses(payload: bytes, nDrones: int, nTicks: int) -> None:
+    uri = f'ws://localhost:{DASHBOARD_PORT}/dashboard'
+    async with websockets.connect(uri, max_queue=None) as webSocket:
+        await webSocket.recv()  # snapshot
+        sender = threading.Thread(target=sendPulses, args=(payload,),
+                                  daemon=True)
+        start = time.perf_counter()
+        sender.start()
+        received = 0
+        lastReceived = start
+        finished = set()
+        while len(finished) < nDrones:
+            try:
+                message = json.loads(await asyncio.wait_for(
+                    webSocket.recv(), IDLE_TIMEOUT))
+            except asyncio.TimeoutError:
+                break
+            if message['type'] == 'pulse':
+                diffs = [message['data']]
+            elif message['type'] == 'pulses':
+                diffs = message['data']
+            else:
+                continue
+            lastReceived = time.perf_counter()
+            received += len(diffs)
+            finished.update(diff['name'] for diff in diffs
+                            if diff['timestamp'] == nTicks - 1)
+    elapsed = lastReceived - start
+    print(f'  {received}/{nDrones * nTicks} pulses received in '
+          f'{elapsed:.2f} s, {received / elapsed:,.0f} pulses/s')
+
+
+if __name__ == '__main__':
+    mode = sys.argv[1] if len(sys.argv) > 1 else 'processes'
+    nDrones = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    nTicks = int(sys.argv[3]) if len(sys.argv) > 3 else 5000
+    ArgosController.TCP_PORT = ARGOS_PORT
+    DashboardController.SERVER_PORT = DASHBOARD_PORT
+    DashboardController.serverMode = 'asyncio'
+    payload = b''.join(makePulse(i, t)
+                       for t in range(nTicks) for i in range(nDrones))
+
+    if mode == 'processes':
+        controllerProcesses = ControllerProcesses({
+            'dashboard': DashboardController,
+            'argos': ArgosController,
+            'crazyradio': FakeRadioController
+        })
+        controllerProcesses.launch()
+    else:
+        CommunicationService().registerControllers(
+            DashboardController, ArgosController, FakeRadioController)
+        threads = [DashboardController.launch(), ArgosController.launch(),
+                   FakeRadioController.launch()]
+    time.sleep(1)
+
+    print(f'{mode}: {nDrones} drones, {nTicks} ticks')
+    asyncio.get_event_loop().run_until_complete(
+        receivePulses(payload, nDrones, nTicks))
+
+    if mode == 'processes':
+        controllerProcesses.stop()
+        controllerProcesses.join()
+    else:
+        DashboardController.stopServer()
+        ArgosController.stopServer()
+        FakeRadioController.stopServer()
+        for thread in threads:
+            thread.join()
+        CommunicationService().stop()
@@ -0,0 +1,98 @@
+"""Compare the legacy and table-driven decoding of Crazyradio telemetry, in
+packets per second.
+
+Usage: python -m benchmarks.crazyradio_decode [nPackets]
+"""
+import math
+import struct
+import sys
+import time
+
+from src.models.crazyradio_packet import PacketReceivedCode, decodePacket
+from src.models.drone import Drone, droneDiff
+from src.services.drones_set import DronesSet
+
+URI = 'radio://0/80/2M/E7E7E7E701'
+
+
+def makePackets(nPackets: int):
+    packets = []
+    for i in range(nPackets):
+        code = i % 4
+        if code == PacketReceivedCode.BATTERY:
+            packets.append(struct.pack('<Bf', code, 80 - i % 7))
+        elif code == PacketReceivedCode.SPEED:
+            packets.append(struct.pack('<Bf', code, (i % 11) / 10))
+        elif code == PacketReceivedCode.POSITION_AND_SENSORS:
+            packets.append(struct.pack('<BffffHHHHH', code, i * 0.001, 0.5,
+                                       0.3, 45.0, 120, 300, 800, 1000, 0))
+        else:
+            packets.append(struct.pack('<BB?', code, 4, i % 2 == 0))
+    return packets
+
+
+def legacyDecode(dronesSet: DronesSet, data: bytes) -> dict:
+    (code,) = struct.unpack_from("<B", data, 0)
+    oldDrone = dronesSet.getDrone(URI)
+    drone = dronesSet.getDrone(URI)
+    if code == PacketReceivedCode.BATTERY:
+        (cd, battery) = struct.unpack("<Bf", data)
+        drone = Drone(**{**drone, "battery": battery})
+    elif code == PacketReceivedCode.SPEED:
+        (cd, speed) = struct.unpack("<Bf", data)
+        drone = Drone(**{**drone, "speed": speed})
+    elif code == PacketReceivedCode.POSITION_AND_SENSORS:
+        (cd, positionX, positionY, positionZ, yaw, front, left,
+         back, right, up) = struct.unpack("<BffffHHHHH", data)
+        drone = Drone(**{
+            **drone,
+            "position": [positionX, positionY, positionZ],
+            "yaw": yaw * math.pi / 180,
+            "ranges": [front, left, back, right]
+        })
+    elif code == PacketReceivedCode.OTHERS:
+        (cd, state, ledOn) = struct.unpack("<BB?", data)
+        drone = Drone(**{
+            **drone,
+            "ledOn": ledOn,
+            "state": ["onTheGround", "takingOff", "landing", "crashed",
+                      "exploring", "standBy", "returningToBase"][state]
+        })
+    drone = Drone(**{**drone, 'timestamp': int(time.time()), 'real': True})
+    dronesSet.setDrone(URI, drone)
+    return droneDiff(oldDrone, drone)
+
+
+def tableDecode(drone: Drone, data: bytes) -> dict:
+    code, changes = decodePacket(drone, data)
+    drone['timestamp'] = int(time.time())
+    changes['name'] = drone['name']
+    changes['timestamp'] = drone['timestamp']
+    return changes
+
+
+def newDrone() -> Drone:
+    return Drone(name=URI, timestamp=0, speed=0.0, battery=0.0,
+                 position=[0.0, 0.0, 0.0], yaw=0.0, ranges=[0, 0, 0, 0],
+                 state='onTheGround', ledOn=False, real=True)
+
+
+if __name__ == '__main__':
+    nPackets = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    packets = makePackets(nPackets)
+
+    dronesSet = DronesSet()
+    dronesSet.setDrone(URI, newDrone())
+    start = time.perf_counter()
+    for packet in packets:
+        legacyDecode(dronesSet, packet)
+    legacy = nPackets / (time.perf_counter() - start)
+
+    drone = newDrone()
+    start = time.perf_counter()
+    for packet in packets:
+        tableDecode(drone, packet)
+    table = nPackets / (time.perf_counter() - start)
+
+    print(f'legacy: {legacy:12,.0f} packets/s')
+    print(f' table: {table:12,.0f} packets/s ({table / legacy:.1f}x)')
@@ -0,0 +1,98 @@
+"""Measure how many dashboards a server mode can hold and the latency of the
+pulses broadcast to all of them.
+
+Usage: python -m benchmarks.dashboard_connections [mode] [nClients] [nMessages]
+"""
+import asyncio
+import json
+import statistics
+import sys
+import threading
+import time
+
+import websockets
+from src.controllers.dashboard_controller import DashboardController
+from src.models.message import Message
+from src.services.communications import CommunicationService
+
+PORT = 5099
+MESSAGE_INTERVAL = 0.01
+
+
+class FakeController:
+    @staticmethod
+    def getCurrentMission() -> None:
+        return None
+
+    @staticmethod
+    def onControllerReceivedMessage(message: Message) -> None:
+        pass
+
+
+def broadcastPulses(nMessages: int) -> None:
+    for index in range(nMessages):
+        DashboardController.onControllerReceivedMessage(Message(
+            type='pulse',
+            data={'name': f'drone {index % 10}', 'timestamp': index,
+                  'sentAt': time.perf_counter()}))
+        time.sleep(MESSAGE_INTERVAL)
+
+
+async def receivePulses(nMessages: int, latencies: list,
+                        connected: asyncio.Event, counter: list,
+                        nClients: int) -> None:
+    uri = f'ws://localhost:{PORT}/dashboard'
+    async with websockets.connect(uri, max_queue=None) as webSocket:
+        counter[0] += 1
+        if counter[0] == nClients:
+            connected.set()
+        received = 0
+        while received < nMessages:
+            message = json.loads(await webSocket.recv())
+            if message['type'] != 'pulse' or 'sentAt' not in message['data']:
+                continue
+            latencies.append(time.perf_counter() - message['data']['sentAt'])
+            received += 1
+            if message['data']['timestamp'] == nMessages - 1:
+                return
+
+
+async def runClients(nClients: int, nMessages: int) -> None:
+    latencies = []
+    connected = asyncio.Event()
+    counter = [0]
+    start = time.perf_counter()
+    tasks = [asyncio.ensure_future(receivePulses(
+        nMessages, latencies, connected, counter, nClients))
+        for _ in range(nClients)]
+    await connected.wait()
+    connectTime = time.perf_counter() - start
+    # Let the server register the last clients before broadcasting
+    await asyncio.sleep(0.5)
+    serverThreads = threading.active_count()
+    producer = threading.Thread(target=broadcastPulses, args=(nMessages,))
+    producer.start()
+    await asyncio.gather(*tasks)
+    producer.join()
+    latencies.sort()
+    print(f'{DashboardController.serverMode}: {nClients} clients connected '
+          f'in {connectTime:.2f} s, {serverThreads} threads')
+    print(f'  {len(latencies)} pulses received, latency median '
+          f'{statistics.median(latencies) * 1000:.2f} ms, p99 '
+          f'{latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms')
+
+
+if __name__ == '__main__':
+    mode = sys.argv[1] if len(sys.argv) > 1 else 'asyncio'
+    nClients = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    nMessages = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+    CommunicationService().registerControllers(
+        DashboardController, FakeController, FakeController)
+    DashboardController.serverMode = mode
+    DashboardController.SERVER_PORT = PORT
+    serverThread = DashboardController.launch()
+    time.sleep(1)
+    asyncio.get_event_loop().run_until_complete(
+        runClients(nClients, nMessages))
+    DashboardController.stopServer()
+    serverThread.join()
@@ -0,0 +1,74 @@
+"""Compare the size and the encoding time of the dashboard messages in each
+encoding, replaying the pulses and mission pulses of a recorded mission.
+
+Usage: python -m benchmarks.dashboard_encoding [nRepeats] [database]
+"""
+import json
+import sys
+import time
+from typing import List
+
+from src.models.message import Message
+from src.services.message_encoding import ENCODINGS, encodeMessage
+
+TICK_RATE = 10
+
+
+def replayMission(mission: dict) -> List[List[Message]]:
+    """Build the messages sent to the dashboards at each tick of a recorded
+    mission: a pulse per drone and a mission pulse with the new points.
+
+      @param mission: the recorded mission.
+    """
+    paths = mission['dronesPaths']
+    points = mission['points']
+    nTicks = max(len(path) for path in paths.values())
+    ticks = []
+    for tick in range(nTicks):
+        messages = []
+        positions = {}
+        for name, path in paths.items():
+            position = path[min(tick, len(path) - 1)]
+            positions[name] = position
+            messages.append(Message(type='pulse', data={
+                'name': name,
+                'timestamp': int(mission['timestamp']) + tick,
+                'position': [position['x'], position['y'], 0.3],
+                'yaw': 0.785 + tick * 0.01,
+                'ranges': [127, 2540, 65530, 300],
+                'battery': 87.5 - tick * 0.1,
+            }))
+        newPoints = points[tick * len(points) // nTicks:
+                           (tick + 1) * len(points) // nTicks]
+        messages.append(Message(type='missionPulse', data={
+            'id': mission['id'],
+            'dronesPositions': positions,
+            'points': newPoints,
+        }))
+        ticks.append(messages)
+    return ticks
+
+
+if __name__ == '__main__':
+    nRepeats = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    database = sys.argv[2] if len(sys.argv) > 2 else 'data/db.json'
+    with open(database) as databaseFile:
+        missions = list(json.load(databaseFile)['missions'].values())
+    mission = max(missions, key=lambda m: len(m['points']))
+    ticks = replayMission(mission)
+    messages = [message for tick in ticks for message in tick]
+    print(f'Mission {mission["id"]}: {len(ticks)} ticks, '
+          f'{len(messages)} messages, replayed at {TICK_RATE} ticks/s')
+    for encoding in ENCODINGS:
+        nBytes = sum(len(encodeMessage(message, encoding))
+                     for message in messages)
+        start = time.perf_counter()
+        for _ in range(nRepeats):
+            for message in messages:
+                encodeMessage(message, encoding)
+        elapsed = time.perf_counter() - start
+        bytesPerSecond = nBytes / len(ticks) * TICK_RATE
+        print(f'{encoding:8s}: {nBytes / len(messages):7.1f} bytes/message, '
+              f'{bytesPerSecond:9,.0f} bytes/s, '
+              f'{elapsed / (nRepeats * len(messages)) * 1e6:6.2f} '
+              f'us/message')
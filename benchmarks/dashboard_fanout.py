@@ -0,0 +1,68 @@
+"""Measure the cost of broadcasting drone pulses to an increasing number of
+dashboards, serializing each message per client or once for all clients.
+
+Usage: python -m benchmarks.dashboard_fanout [nMessages]
+"""
+import json
+import sys
+import time
+
+from src.controllers.dashboard_controller import DashboardController
+from src.services.topic_filter import TopicFilter
+
+
+class FakeSocket:
+    closed = False
+
+    def send(self, message) -> None:
+        pass
+
+
+class FakeClient:
+    throttle = None
+    encoding = 'json'
+    ready = True
+
+    def __init__(self) -> None:
+        self.socket = FakeSocket()
+        self.topics = TopicFilter()
+
+    def queueFrame(self, frame, droppable: bool) -> bool:
+        self.socket.send(frame)
+        return True
+
+
+def makePulse(index: int) -> dict:
+    return {
+        'type': 'pulse',
+        'data': {
+            'name': f'drone {index % 10}',
+            'timestamp': index,
+            'position': [index * 0.01, 0.5, 0.3],
+            'yaw': 0.785,
+            'ranges': [127, 2540, 65530, 300],
+            'battery': 87.5,
+        }
+    }
+
+
+def perClientBroadcast(message: dict) -> None:
+    for client in DashboardController.clients:
+        client.socket.send(json.dumps(message))
+
+
+if __name__ == '__main__':
+    nMessages = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    messages = [makePulse(i) for i in range(nMessages)]
+    for nClients in (1, 5, 20, 50):
+        DashboardController.clients = set(
+            FakeClient() for _ in range(nClients))
+        results = []
+        for broadcast in (perClientBroadcast,
+                          DashboardController.onControllerReceivedMessage):
+            start = time.perf_counter()
+            for message in messages:
+                broadcast(message)
+            results.append(nMessages / (time.perf_counter() - start))
+        print(f'{nClients:3d} clients: per client {results[0]:10,.0f} msg/s, '
+              f'encoded once {results[1]:10,.0f} msg/s')
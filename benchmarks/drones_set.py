@@ -0,0 +1,78 @@
+"""Compare the drones set copying its drones on every read with the copy on
+write drones set, on the reads and writes of the ARGoS pulses, in pulses per
+second.
+
+Usage: python -m benchmarks.drones_set [nDrones] [nTicks]
+"""
+import sys
+import time
+from copy import copy, deepcopy
+
+from src.models.drone import Drone, FrozenDrone, droneDiff
+from src.services.drones_set import DronesSet
+
+
+class CopyingDronesSet:
+    """The drones set before copy on write."""
+
+    def __init__(self) -> None:
+        self.drones = {}
+
+    def getDrones(self) -> dict:
+        return copy(self.drones)
+
+    def getDrone(self, key):
+        if key in self.drones:
+            return deepcopy(self.drones[key])
+        return None
+
+    def setDrone(self, key, drone: Drone) -> Drone:
+        self.drones[key] = drone
+        return drone
+
+
+def makePulse(index: int, tick: int) -> dict:
+    return {
+        'name': f's{index}',
+        'timestamp': tick,
+        'speed': 0.25,
+        'battery': 87.5,
+        'position': [index * 0.1, tick * 0.01, 0.3],
+        'yaw': 0.785,
+        'ranges': [127, 2540, 65530, 300],
+        'state': 'exploring',
+        'ledOn': False,
+    }
+
+
+def handlePulses(dronesSet, pulses, freeze: bool) -> None:
+    """Update the drones like ArgosController.handlePulses, then read them
+    like a mission handler does.
+    """
+    for pulseData in pulses:
+        oldDrone = dronesSet.getDrone(pulseData['name']) or {}
+        drone = {**oldDrone, **pulseData, 'real': False}
+        drone = dronesSet.setDrone(
+            pulseData['name'], FrozenDrone(drone) if freeze else drone)
+        droneDiff(oldDrone, drone)
+        dronesSet.getDrone(pulseData['name'])
+    for drone in dronesSet.getDrones().values():
+        drone['state']
+
+
+if __name__ == '__main__':
+    nDrones = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    nTicks = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    ticks = [[makePulse(i, t) for i in range(nDrones)]
+             for t in range(nTicks)]
+    nPulses = nDrones * nTicks
+
+    results = {}
+    for name, dronesSet, freeze in (('deepcopy', CopyingDronesSet(), False),
+                                    ('snapshots', DronesSet(), True)):
+        start = time.perf_counter()
+        for pulses in ticks:
+            handlePulses(dronesSet, pulses, freeze)
+        results[name] = nPulses / (time.perf_counter() - start)
+        print(f'{name:>9}: {results[name]:12,.0f} pulses/s')
+    print(f'{results["snapshots"] / results["deepcopy"]:.1f}x')
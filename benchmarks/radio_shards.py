@@ -0,0 +1,48 @@
+"""Time the probes of the radio shards with a fake link driver, for drones
+found on their assigned dongle and for drones found by the full scan, and
+print how many drones every dongle carries.
+
+Usage: python -m benchmarks.radio_shards [nDongles] [nDrones] [nRounds]
+"""
+import sys
+import time
+from collections import Counter
+
+from src.services.radio_shards import FakeLinkDriver, RadioShards
+
+FIRST_DRONE_ADDRESS = 0xE7E7E7E701
+
+if __name__ == '__main__':
+    nDongles = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    nDrones = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    nRounds = int(sys.argv[3]) if len(sys.argv) > 3 else 2000
+    addresses = range(FIRST_DRONE_ADDRESS, FIRST_DRONE_ADDRESS + nDrones)
+
+    for channelPerDongle in (False, True):
+        placement = RadioShards(FakeLinkDriver(nDongles, {}),
+                                channelPerDongle)
+        placement.detectDongles()
+        assigned = {}
+        for address in addresses:
+            dongle = placement.getDongle(address)
+            assigned[address] = (dongle, placement.getChannel(dongle), '2M')
+        elsewhere = {address: (0, 20, '250K') for address in addresses}
+
+        print(f'channelPerDongle={channelPerDongle}')
+        for name, drones in (('assigned', assigned),
+                             ('full scan', elsewhere)):
+            shards = RadioShards(FakeLinkDriver(nDongles, drones),
+                                 channelPerDongle)
+            shards.detectDongles()
+            start = time.perf_counter()
+            for _ in range(nRounds):
+                for address in addresses:
+                    shards.probe(address)
+            elapsed = time.perf_counter() - start
+            print(f'  {name:>9}: {nRounds * nDrones / elapsed:12,.0f} '
+                  f'probes/s')
+
+        loads = Counter(placement.getDongle(address) for address in addresses)
+        print('  ' + ', '.join(
+            f'dongle {dongle} ch {placement.getChannel(dongle)}: '
+            f'{loads[dongle]} drones' for dongle in range(nDongles)))
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 
+import argparse
 import logging
 import signal
 
@@ -7,16 +8,24 @@ from src.controllers.argos_controller import ArgosController
 from src.controllers.crazyradio_controller import CrazyradioController
 from src.controllers.dashboard_controller import DashboardController
 from src.services.communications import CommunicationService
+from src.services.controller_processes import ControllerProcesses
 from src.utils.setup_logging import setupLogging
 from src.services.database import DatabaseService
 from src.models.mission import MissionPulse
 
 
+controllerProcesses = None
+
+
 def exitHandler(sig, frame):
     logging.info('Closing server application')
+    if controllerProcesses is not None:
+        controllerProcesses.stop()
+        return
     CrazyradioController.stopServer()
     ArgosController.stopServer()
     DashboardController.stopServer()
+    CommunicationService().stop()
 
 
 def failAllNotCompletedMissions():
@@ -27,6 +36,19 @@ def failAllNotCompletedMissions():
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--dashboard-server', choices=['threaded', 'asyncio'],
+        default='threaded',
+        help='threaded: one thread per dashboard, asyncio: every dashboard '
+             'on a single event loop')
+    parser.add_argument(
+        '--controllers', choices=['threads', 'processes'], default='threads',
+        help='threads: every controller in this process, processes: every '
+             'controller in its own process, sharing the drones through '
+             'shared memory')
+    args = parser.parse_args()
+
     # Some initializations
     setupLogging()
 
@@ -35,34 +57,47 @@ if __name__ == '__main__':
     signal.signal(signal.SIGTERM, exitHandler)
     signal.signal(signal.SIGHUP, exitHandler)
 
-    # Register all controllers
-    CommunicationService().registerControllers(
-        DashboardController,
-        ArgosController,
-        CrazyradioController
-    )
-
     # Terminate any in progress missions
     missions = DatabaseService.getAllMissions()
 
     # Make sure to not have any not completed mission
     failAllNotCompletedMissions()
 
-    # Crazyradio Controller
-    crazyradioControllerThread = CrazyradioController().launch()
-    logging.info('Crazyradio controller launched')
-
-    # Argos Controller
-    argosControllerThread = ArgosController().launch()
-    logging.info('Argos controller launched')
-
-    # Dashboard Controller
-    dashboardControllerThread = DashboardController().launch()
-    logging.info('Dashboard controller launched')
-
-    # Wait for the Thread to finish
-    crazyradioControllerThread.join()
-    argosControllerThread.join()
-    dashboardControllerThread.join()
+    DashboardController.serverMode = args.dashboard_server
+
+    if args.controllers == 'processes':
+        # The processes are forked and inherit the configuration above
+        controllerProcesses = ControllerProcesses({
+            'dashboard': DashboardController,
+            'argos': ArgosController,
+            'crazyradio': CrazyradioController
+        })
+        controllerProcesses.launch()
+        logging.info('Controller processes launched')
+        controllerProcesses.join()
+    else:
+        # Register all controllers
+        CommunicationService().registerControllers(
+            DashboardController,
+            ArgosController,
+            CrazyradioController
+        )
+
+        # Crazyradio Controller
+        crazyradioControllerThread = CrazyradioController().launch()
+        logging.info('Crazyradio controller launched')
+
+        # Argos Controller
+        argosControllerThread = ArgosController().launch()
+        logging.info('Argos controller launched')
+
+        # Dashboard Controller
+        dashboardControllerThread = DashboardController().launch()
+        logging.info('Dashboard controller launched')
+
+        # Wait for the Thread to finish
+        crazyradioControllerThread.join()
+        argosControllerThread.join()
+        dashboardControllerThread.join()
 
     logging.info('All Controllers have stopped')
@@ -1,44 +1,203 @@
+import json
+import logging
 import socket
-from threading import Thread
-
-from flask_threaded_sockets.websocket import WebSocket
+from collections import deque
+from threading import Lock
+from typing import Deque, List, Optional
 
+from src.models.argos_packet import (PULSE_STRUCT, PULSES_HEADER_STRUCT,
+                                     ArgosPacketCode, PulseFormat,
+                                     decodePulses)
 from src.models.connection import Connection, HandlerType
+from src.models.message import Message
+from src.services.drones_set import DronesSet
+from src.services.fleet_view import FleetView
+from src.services.mission_handler import MissionHandler
+from src.utils.receive_buffer import ReceiveBuffer
 
 
 class ArgosClient:
+    RECV_SIZE = 65536
+    MAX_PENDING_BYTES = 1 << 20
+
     def __init__(self) -> None:
         self.socket = None
+        self.id = ''
         self.connection = Connection()
+        self.receiveBuffer = ReceiveBuffer(ArgosClient.RECV_SIZE)
+        self.pulseFormat: PulseFormat = 'json'
+        self.handshakeDone = False
+        self.dronesSet = DronesSet(FleetView())
+        self.missionHandler: Optional[MissionHandler] = None
+        self.outbound: Deque[bytes] = deque()
+        self.outboundSize = 0
+        self.outboundLock = Lock()
+        self.writeBuffer = bytearray()
 
-    def connect(self, webSocket: WebSocket) -> None:
-        """Assign the client to the specified websocket and start a thread to
-        handle the communication.
+    def connect(self, clientSocket: socket.socket, addr) -> None:
+        """Assign the client to the specified socket. The socket is then read
+        by the controller event loop each time it becomes readable.
 
-          @param webSocket: the socket on witch the client is connected.
+          @param clientSocket: the socket on witch the client is connected.
+          @param addr: the address of the simulation.
         """
-        self.socket = webSocket
-        Thread(target=self.handleCommunications).start()
+        self.socket = clientSocket
+        self.socket.setblocking(False)
+        self.id = f'{addr[0]}:{addr[1]}' if isinstance(addr, tuple) \
+            else str(addr)
+        self.connection.callAllCallbacks(HandlerType.connection)
 
-    def handleCommunications(self):
-        """Listen on the socket for messages. It closes the client if it
-        receive an empty string.
+    def handleCommunications(self) -> bool:
+        """Read once from the readable socket. Every complete message received
+        is decoded and the decoded messages are given to the callbacks in one
+        call. It closes the client if the peer closes the connection. Returns
+        False once the client is closed.
 
         """
-        self.connection.callAllCallbacks(HandlerType.connection)
         try:
-            while True:
-                message = self.socket.recv(2048)
-                if message == b'':
-                    self.socket.close()
-                    break
+            try:
+                nBytes = self.receiveBuffer.recvFrom(self.socket)
+            except (BlockingIOError, InterruptedError):
+                return True
+            if nBytes == 0:
+                self.socket.close()
+                self.connection.callAllCallbacks(HandlerType.disconnection)
+                return False
+            messages = self.popMessages()
+            if messages:
                 self.connection.callAllCallbacks(
-                    HandlerType.message, message)
+                    HandlerType.message, messages)
+            return True
         except Exception as e:
-            self.socket.close()
-            self.connection.callAllCallbacks(HandlerType.error, e)
-        finally:
-            self.connection.callAllCallbacks(HandlerType.disconnection)
+            self.closeOnError(e)
+            return False
+
+    def closeOnError(self, error: Exception) -> None:
+        """Close the socket after a failed read or write, then call the error
+        and disconnection callbacks.
+
+          @param error: the exception raised by the socket.
+        """
+        self.socket.close()
+        self.connection.callAllCallbacks(HandlerType.error, error)
+        self.connection.callAllCallbacks(HandlerType.disconnection)
+
+    def popMessages(self) -> List[Message]:
+        """Decode every complete message of the receive buffer, according to
+        the negotiated pulse format. Json lines that can't be parsed are
+        logged and skipped.
+
+        """
+        messages: List[Message] = []
+        if not self.handshakeDone:
+            line = self.receiveBuffer.popLine()
+            if line is None:
+                return messages
+            self.handshakeDone = True
+            try:
+                message = json.loads(line)
+            except ValueError:
+                logging.error(
+                    f'ARGoS client received a wrong json format : {line}')
+            else:
+                if message['type'] == 'hello':
+                    self.negotiate(message)
+                else:
+                    messages.append(message)
+
+        if self.pulseFormat == 'binary':
+            messages.extend(self.popBinaryMessages())
+            return messages
+
+        for line in self.receiveBuffer.popLines():
+            try:
+                messages.append(json.loads(line))
+            except ValueError:
+                logging.error(
+                    f'ARGoS client received a wrong json format : {line}')
+        return messages
+
+    def popBinaryMessages(self) -> List[Message]:
+        """Decode every complete binary frame of the receive buffer. A pulse
+        frame gives a pulse message and a pulses frame gives a single pulses
+        message holding the drones of the whole tick.
+
+        """
+        messages: List[Message] = []
+        while True:
+            header = self.receiveBuffer.peek(PULSES_HEADER_STRUCT.size)
+            if header is None:
+                return messages
+            (code, count) = PULSES_HEADER_STRUCT.unpack(header)
+            if code == ArgosPacketCode.PULSES:
+                frame = self.receiveBuffer.popFrame(
+                    PULSES_HEADER_STRUCT.size + count * PULSE_STRUCT.size)
+                if frame is None:
+                    return messages
+                messages.append(Message(type='pulses', data=list(
+                    decodePulses(frame[PULSES_HEADER_STRUCT.size:]))))
+            else:
+                frame = self.receiveBuffer.popFrame(PULSE_STRUCT.size)
+                if frame is None:
+                    return messages
+                messages.extend(Message(type='pulse', data=pulse)
+                                for pulse in decodePulses(frame))
+
+    def negotiate(self, hello: Message) -> None:
+        """Choose the pulse format from the ones offered by the simulation in
+        its hello message and acknowledge the choice. Json is kept if the
+        simulation doesn't offer the binary format.
+
+          @param hello: the hello message sent by the simulation.
+        """
+        formats = hello['data'].get('formats', [])
+        self.pulseFormat = 'binary' if 'binary' in formats else 'json'
+        reply = Message(type='hello', data={
+            'format': self.pulseFormat,
+            'frameSize': PULSE_STRUCT.size,
+        })
+        self.queueMessage(reply)
+        logging.info(f'ARGoS client uses the {self.pulseFormat} pulse format')
+
+    def queueMessage(self, message: Message) -> bool:
+        """Encode the message and add it to the outbound queue. Never blocks:
+        returns False if the peer doesn't read fast enough and the queue is
+        full, in witch case the message is dropped.
+
+          @param message: the message to send.
+        """
+        data = bytes(json.dumps(message) + '\n', 'ascii')
+        with self.outboundLock:
+            if self.outboundSize + len(data) > ArgosClient.MAX_PENDING_BYTES:
+                return False
+            self.outbound.append(data)
+            self.outboundSize += len(data)
+        return True
+
+    def hasPendingOutput(self) -> bool:
+        """Whether some queued bytes are not yet written to the socket.
+
+        """
+        return self.outboundSize > 0
+
+    def flush(self) -> bool:
+        """Write as much of the queued messages as the socket accepts, in as
+        few send calls as possible. Returns True if bytes remain to be sent
+        once the socket is writable again.
+
+        """
+        with self.outboundLock:
+            while self.outbound:
+                self.writeBuffer += self.outbound.popleft()
+        while self.writeBuffer:
+            try:
+                nBytes = self.socket.send(self.writeBuffer)
+            except (BlockingIOError, InterruptedError):
+                return True
+            del self.writeBuffer[:nBytes]
+            with self.outboundLock:
+                self.outboundSize -= nBytes
+        return False
 
     def closeClient(self):
         """Force close the connection. Called by the sigint handler.
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+
+import websockets
+from src.clients.dashboard_client import DashboardClient
+from src.models.connection import HandlerType
+
+
+class AsyncDashboardClient(DashboardClient):
+    """Dashboard client served by the event loop of the asyncio server
+    instead of its own threads. The messages are queued the same way, and a
+    coroutine writes them to the socket.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Initialize the client on the event loop of the server.
+
+          @param loop: the event loop of the server.
+        """
+        super().__init__()
+        self.loop = loop
+        self.outboundReady = asyncio.Event()
+        self.outbound.onReady = self.onOutboundReady
+
+    def onOutboundReady(self) -> None:
+        """Wake up the writer coroutine. Called from any thread.
+
+        """
+        self.loop.call_soon_threadsafe(self.outboundReady.set)
+
+    async def serve(self, webSocket) -> None:
+        """Handle the connection until the socket closes. The callbacks run
+        in the default executor, since they may block on the database or on
+        the other controllers.
+
+          @param webSocket: the socket of the new connection.
+        """
+        self.socket = webSocket
+        writer = self.loop.create_task(self.writeMessagesAsync())
+        await self.loop.run_in_executor(
+            None, self.connection.callAllCallbacks, HandlerType.connection)
+        try:
+            async for message in webSocket:
+                await self.loop.run_in_executor(
+                    None, self.connection.callAllCallbacks,
+                    HandlerType.message, message)
+        except websockets.ConnectionClosed:
+            pass
+        except Exception as e:
+            logging.error(e)
+            self.connection.callAllCallbacks(HandlerType.error, e)
+        finally:
+            self.outbound.close()
+            writer.cancel()
+            await self.loop.run_in_executor(
+                None, self.connection.callAllCallbacks,
+                HandlerType.disconnection)
+
+    async def writeMessagesAsync(self) -> None:
+        """Write the queued frames to the socket until the client closes. The
+        updates merged by the throttle are queued at each of its ticks.
+
+        """
+        while not self.outbound.closed:
+            throttle = self.throttle
+            try:
+                await asyncio.wait_for(
+                    self.outboundReady.wait(),
+                    None if throttle is None else throttle.timeUntilTick())
+            except asyncio.TimeoutError:
+                pass
+            self.outboundReady.clear()
+            if throttle is not None and throttle.timeUntilTick() == 0:
+                throttle.flush(self.queueMessage)
+            frame = self.outbound.get(0)
+            while frame is not None:
+                try:
+                    await self.socket.send(frame)
+                except Exception as e:
+                    logging.error(e)
+                    self.outbound.close()
+                    return
+                frame = self.outbound.get(0)
+
+    def closeClient(self):
+        """Force close the connection. Can be called from any thread.
+
+        """
+        self.outbound.close()
+        asyncio.run_coroutine_threadsafe(self.socket.close(), self.loop)
@@ -1,61 +1,85 @@
 import logging
 import struct
 
-from typing import Union, List
+from typing import Optional, Union, List
 
 from cflib.crazyflie import Crazyflie
 from src.models.connection import Connection, HandlerType
+from src.models.drone import Drone
 from src.models.message import Message, MessageType
+from src.services.ingestion_queue import IngestionQueue
+from src.services.uplink_scheduler import UplinkScheduler
 from cflib.crtp.crtpstack import CRTPPort
 
 
 class CrazyradioClient:
 
-    def __init__(self) -> None:
+    def __init__(self, ingestionQueue: Optional[IngestionQueue] = None
+                 ) -> None:
         self.uri = ''
         self._cf: Union[Crazyflie, None] = None
         self.connection = Connection()
+        self.ingestionQueue = ingestionQueue
+        self.uplink: Optional[UplinkScheduler] = None
         self.queue = ''
+        self.drone: Optional[Drone] = None
 
     def connect(self, droneUri: str) -> None:
         """Assign the client to the connection. Add callbacks for the
-        different events.
+        different events. The events are handed to the ingestion queue so
+        the cflib link thread is never held by their processing.
 
           @param droneUri: the drone's identifier.
         """
         self.uri = droneUri
         self._cf = Crazyflie()
+        self.uplink = UplinkScheduler(droneUri,
+                                      self._cf.appchannel.send_packet)
 
         # for port_callback in self._cf.incoming.cb:
         #     if port_callback.port == CRTPPort.CONSOLE:
         #         self._cf.incoming.cb.remove(port_callback)
 
         self._cf.connected.add_callback(
-            lambda uri: self.connection.callAllCallbacks(
-                HandlerType.connection))
+            lambda uri: self.dispatch(HandlerType.connection))
 
         self._cf.disconnected.add_callback(
-            lambda uri: self.connection.callAllCallbacks(
-                HandlerType.disconnection))
+            lambda uri: self.dispatch(HandlerType.disconnection))
 
         self._cf.connection_failed.add_callback(
-            lambda uri, msg: self.connection.callAllCallbacks(HandlerType.error,
-                                                              msg))
+            lambda uri, msg: self.dispatch(HandlerType.error, msg))
 
         self._cf.connection_lost.add_callback(
-            lambda uri, msg: self.connection.callAllCallbacks(HandlerType.error,
-                                                              msg))
+            lambda uri, msg: self.dispatch(HandlerType.error, msg))
 
         self._cf.appchannel.packet_received.add_callback(
-            lambda data: self.connection.callAllCallbacks(HandlerType.message,
-                                                          data))
+            lambda data: self.dispatch(
+                HandlerType.message, data,
+                coalesceKey=data[0] if len(data) else None))
 
         self._cf.add_port_callback(CRTPPort.CONSOLE, self._console)
 
         self._cf.open_link(droneUri)
 
+    def dispatch(self, handlerType: HandlerType, *args,
+                 coalesceKey=None) -> None:
+        """Hand an event to the ingestion queue, or call its callbacks
+        directly if the client has no queue.
+
+          @param handlerType: the type of the event.
+          @param args: the arguments of the event.
+          @param coalesceKey: the key of the telemetry replaced by this
+          event, None if the event must not be replaced.
+        """
+        if self.ingestionQueue is None:
+            self.connection.callAllCallbacks(handlerType, *args)
+            return
+        self.ingestionQueue.put(self.uri, self.connection.callAllCallbacks,
+                                (handlerType, *args), coalesceKey)
+
     def sendMessage(self, message: Message) -> None:
-        """Take given message string and sends it as bytes to the appchannel.
+        """Take given message string and schedules it as bytes for the
+        appchannel, according to the priority of the command.
 
           @param message: the message to send
         """
@@ -63,6 +87,20 @@ class CrazyradioClient:
             'name'] != '*':
             return
 
+        command = CrazyradioClient.encodeCommand(message['type'])
+        if command is None:
+            logging.error(
+                f'Crazyradio got unrecognized command to send : {message}')
+            return
+        self.uplink.schedule(message['type'], command)
+
+    @staticmethod
+    def encodeCommand(messageType: MessageType) -> Optional[bytes]:
+        """Returns the appchannel payload of a command, or None if the
+        message type isn't a drone command.
+
+          @param messageType: the type of the command message.
+        """
         allPossibleCommands: List[str] = [
             'startMission',
             'stopMission',
@@ -73,12 +111,9 @@ class CrazyradioClient:
             'darken'
         ]
         try:
-            command = allPossibleCommands.index(message['type'])
-            if command < len(allPossibleCommands):
-                self._cf.appchannel.send_packet(struct.pack("<B", command))
+            return struct.pack("<B", allPossibleCommands.index(messageType))
         except ValueError:
-            logging.error(
-                f'Crazyradio got unrecognized command to send : {message}')
+            return None
 
     def _console(self, packet):
         """
@@ -102,4 +137,6 @@ class CrazyradioClient:
         """Force close the client connection. Called by the sigint handler
 
         """
+        if self.uplink is not None:
+            self.uplink.stop()
         self._cf.close_link()
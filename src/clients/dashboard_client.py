@@ -1,25 +1,41 @@
 import logging
 from threading import Thread
-from typing import Optional
+from typing import Optional, Tuple
 
 from flask_threaded_sockets.websocket import WebSocket
 from src.models.connection import Connection, HandlerType
+from src.models.message import Message, MessageEncoding
+from src.services.message_encoding import encodeMessage
+from src.services.outbound_queue import Frame, OutboundQueue
+from src.services.pulse_throttle import PulseThrottle
+from src.services.topic_filter import TopicFilter
 
 
 class DashboardClient:
+    DROPPABLE_TYPES = {'pulse', 'pulses'}
 
     def __init__(self) -> None:
         self.socket: Optional[WebSocket] = None
         self.thread = None
+        self.writerThread = None
         self.connection = Connection()
+        self.outbound = OutboundQueue()
+        self.throttle: Optional[PulseThrottle] = None
+        self.topics = TopicFilter()
+        self.encoding: MessageEncoding = 'json'
+        self.resumeFrom: Optional[Tuple[str, int]] = None
+        self.ready = False
 
     def connect(self, socket) -> None:
         """Assigning the client to the specified socket and start a thread to
-        handle the communication.
+        handle the communication, and another one to write the queued
+        messages.
 
           @param socket: the socket on witch the client is connected.
         """
         self.socket: WebSocket = socket
+        self.writerThread = Thread(target=self.writeMessages)
+        self.writerThread.start()
         self.thread = Thread(target=self.handleCommunications)
         self.thread.start()
 
@@ -38,10 +54,66 @@ class DashboardClient:
             self.socket.close()
             self.connection.callAllCallbacks(HandlerType.error, e)
         finally:
+            self.outbound.close()
             self.connection.callAllCallbacks(HandlerType.disconnection)
 
+    def queueFrame(self, frame: Frame, droppable: bool) -> bool:
+        """Queue an encoded frame for the writer thread. Never blocks. Returns
+        False if the client lags too much behind and should be disconnected.
+
+          @param frame: the encoded message.
+          @param droppable: whether the frame may be dropped if the client is
+          slow.
+        """
+        return self.outbound.put(frame, droppable)
+
+    def queueMessage(self, message: Message) -> bool:
+        """Encode a message and queue it for the writer thread. Returns False
+        if the client lags too much behind and should be disconnected.
+
+          @param message: the message to send.
+        """
+        return self.queueFrame(
+            encodeMessage(message, self.encoding),
+            message['type'] in DashboardClient.DROPPABLE_TYPES)
+
+    def setMaxRate(self, maxRate: Optional[float]) -> None:
+        """Limit the number of pulses and mission pulses sent per second.
+        The updates received during a tick are merged and sent at its end.
+
+          @param maxRate: the maximum number of updates per second, None or 0
+          to send every update as soon as it is received.
+        """
+        if self.throttle is not None:
+            self.throttle.flush(self.queueMessage)
+        self.throttle = PulseThrottle(maxRate) if maxRate else None
+        self.outbound.wakeup()
+
+    def writeMessages(self) -> None:
+        """Write the queued frames to the socket until the client closes. The
+        updates merged by the throttle are queued at each of its ticks.
+
+        """
+        while True:
+            throttle = self.throttle
+            frame = self.outbound.get(
+                None if throttle is None else throttle.timeUntilTick())
+            if self.outbound.closed:
+                return
+            if throttle is not None and throttle.timeUntilTick() == 0:
+                throttle.flush(self.queueMessage)
+            if frame is None:
+                continue
+            try:
+                self.socket.send(frame)
+            except Exception as e:
+                logging.error(e)
+                self.outbound.close()
+                return
+
     def closeClient(self):
         """Force close the connection. Called by the sigint handler.
 
         """
+        self.outbound.close()
         self.socket.__del__()
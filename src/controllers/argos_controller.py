@@ -1,34 +1,33 @@
-import json
 import logging
-import math
-import pathlib
+import selectors
 import socket
-import time
-from io import StringIO
-from threading import Thread
-from typing import Any, List, Optional, Set, Union
+from threading import Lock, Thread
+from typing import Dict, List, Optional, Set
 
 from src.clients.argos_client import ArgosClient
 from src.metaclasses.singleton import Singleton
 from src.models.connection import HandlerType
-from src.models.drone import Drone, droneDiff
+from src.models.drone import FrozenDrone, droneDiff
 from src.models.message import Message
 from src.models.mission import Mission, Vec2
 from src.services.communications import CommunicationService
 from src.services.drones_set import DronesSet
-from src.services.mission_handler import MissionHandler
+from src.services.mission_handler import MissionHandler, PositionAndRange
 
 
 class ArgosController(metaclass=Singleton):
     TCP_HOST = '0.0.0.0'
     TCP_PORT = 3995
-    BUFFER_SIZE = 20
     N_MAX_DRONES = 10
     TCPServer: socket = None
     running = True
-    dronesSet = DronesSet()
-    missionHandler: MissionHandler = None
-    client: ArgosClient = None
+    selector: selectors.BaseSelector = None
+    wakeupReader: socket = None
+    wakeupWriter: socket = None
+    clients: Set[ArgosClient] = set()
+    droneClients: Dict[str, ArgosClient] = {}
+    flushRequests: Set[ArgosClient] = set()
+    flushLock = Lock()
 
     @staticmethod
     def launch() -> Thread:
@@ -42,8 +41,9 @@ class ArgosController(metaclass=Singleton):
 
     @staticmethod
     def launchServer():
-        """Start the TCP server in non-blocking mode. Tries to accept new
-        connection as long as the server is running.
+        """Start the TCP server and its event loop. The loop waits without
+        timeout for new connections or readable simulations, and serves every
+        connected simulation as long as the server is running.
 
         """
         TCPServer = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -53,36 +53,158 @@ class ArgosController(metaclass=Singleton):
         TCPServer.listen(ArgosController.N_MAX_DRONES)
         ArgosController.TCPServer = TCPServer
 
+        wakeupReader, wakeupWriter = socket.socketpair()
+        wakeupReader.setblocking(False)
+        wakeupWriter.setblocking(False)
+        ArgosController.wakeupReader = wakeupReader
+        ArgosController.wakeupWriter = wakeupWriter
+
+        selector = selectors.DefaultSelector()
+        selector.register(TCPServer, selectors.EVENT_READ)
+        selector.register(wakeupReader, selectors.EVENT_READ)
+        ArgosController.selector = selector
+
         while ArgosController.running:
+            for key, events in selector.select():
+                if key.fileobj is TCPServer:
+                    ArgosController.acceptClient()
+                elif key.fileobj is wakeupReader:
+                    ArgosController.drainWakeups()
+                    ArgosController.flushRequestedClients()
+                else:
+                    ArgosController.handleClientEvents(key.data, events)
+
+        # The selector no longer reads the clients, so their disconnection
+        # callbacks are called here to stop their missions
+        for client in list(ArgosController.clients):
             try:
-                if ArgosController.client is None:
-                    clientSocket, addr = TCPServer.accept()
-                    ArgosController.handleClient(clientSocket, addr)
-            except:
+                client.closeClient()
+            except OSError:
                 pass
-            time.sleep(1)
+            client.socket.close()
+            client.connection.callAllCallbacks(HandlerType.disconnection)
+        selector.close()
+        TCPServer.close()
+        wakeupReader.close()
+        wakeupWriter.close()
 
     @staticmethod
     def stopServer():
-        """Closes all the clients connections, then closes the server.
+        """Stops the event loop, witch then closes all the clients connections
+        and the server.
 
         """
-        # for client in ArgosController.clients:
-        #     client.closeClient()
-        if ArgosController.client is not None:
-            ArgosController.client.closeClient()
         ArgosController.running = False
-        ArgosController.TCPServer.close()
+        ArgosController.wakeup()
+
+    @staticmethod
+    def wakeup():
+        """Interrupts the event loop wait so it checks its state again. Can be
+        called from any thread.
+
+        """
+        if ArgosController.wakeupWriter is None:
+            return
+        try:
+            ArgosController.wakeupWriter.send(b'\0')
+        except (BlockingIOError, OSError):
+            # A full wakeup socket already wakes the loop
+            pass
+
+    @staticmethod
+    def drainWakeups():
+        """Empties the wakeup socket of the event loop.
+
+        """
+        try:
+            while ArgosController.wakeupReader.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    @staticmethod
+    def handleClientEvents(client: ArgosClient, events: int):
+        """Reads the client socket if it is readable, then writes its queued
+        messages if it is writable or if reading queued a reply.
+
+          @param client: the client whose socket is ready.
+          @param events: the selector events ready on the socket.
+        """
+        if events & selectors.EVENT_READ and \
+                not client.handleCommunications():
+            return
+        if events & selectors.EVENT_WRITE or client.hasPendingOutput():
+            ArgosController.flushClient(client)
+
+    @staticmethod
+    def requestFlush(client: ArgosClient):
+        """Asks the event loop to write the queued messages of the client. Can
+        be called from any thread and never blocks.
+
+          @param client: the client with queued messages.
+        """
+        with ArgosController.flushLock:
+            alreadyRequested = len(ArgosController.flushRequests) != 0
+            ArgosController.flushRequests.add(client)
+        if not alreadyRequested:
+            ArgosController.wakeup()
+
+    @staticmethod
+    def flushRequestedClients():
+        """Writes the queued messages of every client that requested it.
+
+        """
+        with ArgosController.flushLock:
+            clients = ArgosController.flushRequests
+            ArgosController.flushRequests = set()
+        for client in clients:
+            if client in ArgosController.clients:
+                ArgosController.flushClient(client)
+
+    @staticmethod
+    def flushClient(client: ArgosClient):
+        """Writes the queued messages of the client, and waits for its socket
+        to be writable again if they couldn't all be written. The client is
+        closed if the write fails.
+
+          @param client: the client to flush.
+        """
+        try:
+            remaining = client.flush()
+        except OSError as e:
+            logging.error(f'ARGoS client {client.id} write failed: {e}')
+            client.closeOnError(e)
+            return
+        events = selectors.EVENT_READ
+        if remaining:
+            events |= selectors.EVENT_WRITE
+        try:
+            ArgosController.selector.modify(client.socket, events, client)
+        except (KeyError, ValueError):
+            pass
+
+    @staticmethod
+    def acceptClient():
+        """Accepts every pending connection of the server socket.
+
+        """
+        while True:
+            try:
+                clientSocket, addr = ArgosController.TCPServer.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            ArgosController.handleClient(clientSocket, addr)
 
     @staticmethod
     def handleClient(clientSocket, addr):
-        """Creates a client witch will listen to the new connection.
-        Callbacks handlers are set for every event.
+        """Creates a client witch will handle the new connection and registers
+        its socket in the event loop. Callbacks handlers are set for every
+        event.
 
           @param clientSocket: the socket of the new connection.
+          @param addr: the address of the new connection.
         """
-        ArgosController.client = ArgosClient()
-        ArgosController.dronesSet = DronesSet()
+        client = ArgosClient()
         handlers = [
             [HandlerType.connection, ArgosController.onClientConnect],
             [HandlerType.disconnection, ArgosController.onClientDisconnect],
@@ -90,12 +212,15 @@ class ArgosController(metaclass=Singleton):
             [HandlerType.error, ArgosController.onClientRaisedError],
         ]
         for handlerType, handlerFunc in handlers:
-            ArgosController.client.connection.addCallback(
+            client.connection.addCallback(
                 handlerType,
                 handlerFunc,
-                ArgosController.client
+                client
             )
-        ArgosController.client.connect(clientSocket)
+        ArgosController.clients.add(client)
+        ArgosController.selector.register(
+            clientSocket, selectors.EVENT_READ, client)
+        client.connect(clientSocket, addr)
 
     @staticmethod
     def onClientConnect(client: ArgosClient) -> None:
@@ -103,7 +228,7 @@ class ArgosController(metaclass=Singleton):
 
           @param client: the client witch called the function.
         """
-        logging.info(f'New ARGoS client connected on socket {client.socket}')
+        logging.info(f'New ARGoS client connected from {client.id}')
 
     @staticmethod
     def onClientDisconnect(client: ArgosClient) -> None:
@@ -113,68 +238,94 @@ class ArgosController(metaclass=Singleton):
 
           @param client: the client witch called the function.
         """
-        logging.info(f'ARGoS client disconnected from socket {client.socket}')
+        logging.info(f'ARGoS client {client.id} disconnected')
+        try:
+            ArgosController.selector.unregister(client.socket)
+        except (KeyError, ValueError):
+            pass
+        ArgosController.clients.discard(client)
+        drones = client.dronesSet.getDrones()
+        for drone in drones:
+            client.dronesSet.removeDrone(drone)
+            if ArgosController.droneClients.get(drone) is client:
+                del ArgosController.droneClients[drone]
+                CommunicationService().unregisterDrone(drone, 'argos')
         if ArgosController.running:
-            drones = ArgosController.dronesSet.getDrones()
             for drone in drones:
                 CommunicationService().sendToDashboardController(
                     Message(
                         type="disconnect",
                         data={"name": drone}
-                    )
+                    ),
+                    'argos'
                 )
-        ArgosController.client = None
-        ArgosController.dronesSet = DronesSet()
-        if ArgosController.missionHandler is not None:
-            ArgosController.missionHandler.stopMission()
-            ArgosController.missionHandler = None
+        if client.missionHandler is not None:
+            client.missionHandler.stopMission()
+            client.missionHandler = None
 
     @staticmethod
-    def onClientReceivedMessage(client: ArgosClient, message: bytes) -> None:
-        """Called by the client when it receives a message. The message is
-        first decoded from byte to ascii, then parsed as json. It updates the
-        drone stored status, then sends the message to the dashboards and
-        the mission handler if it exists.
+    def onClientReceivedMessage(client: ArgosClient,
+                                messages: List[Message]) -> None:
+        """Called by the client when it receives complete messages. Pulse
+        and pulses messages update the drones of the simulation.
 
-          @param message: the message in bytes received by the client.
+          @param client: the client witch called the function.
+          @param messages: the messages decoded by the client.
         """
-        try:
-            messageStr = message.decode('utf-8')
-            messages = list(filter(lambda x: x, messageStr.split('\n')))
-            parsedMessages: List = list(
-                map(lambda x: json.load(StringIO(x)), messages))
-        except ValueError as e:
-            logging.error(e)
-            logging.error(
-                f'ARGoS client received a wrong json format : {message}')
+        for parsedMessage in messages:
+            if parsedMessage['type'] == 'pulse':
+                ArgosController.handlePulses(
+                    client, [parsedMessage['data']], batched=False)
+            elif parsedMessage['type'] == 'pulses':
+                ArgosController.handlePulses(
+                    client, parsedMessage['data'], batched=True)
+
+    @staticmethod
+    def handlePulses(client: ArgosClient, pulses: List[dict],
+                     batched: bool) -> None:
+        """Updates the stored status of the drones in a single pass, then
+        sends their changes to the dashboards and their positions to the
+        mission handler if it exists. A batch of pulses of the same tick is
+        sent as one pulses message and one mission pulse.
+
+          @param client: the client of the simulation.
+          @param pulses: the pulses data of the drones.
+          @param batched: whether the pulses come from a pulses message.
+        """
+        diffs: List[dict] = []
+        updates: List[PositionAndRange] = []
+        for pulseData in pulses:
+            oldDrone = client.dronesSet.getDrone(pulseData['name'])
+            if not oldDrone:
+                oldDrone = {}
+                ArgosController.droneClients[pulseData['name']] = client
+                CommunicationService().registerDrone(
+                    pulseData['name'], 'argos')
+            # Frozen before the diff, so that its lists compare equal to the
+            # tuples of the old drone
+            drone = client.dronesSet.setDrone(
+                pulseData['name'],
+                FrozenDrone({**oldDrone, **pulseData, "real": False}))
+            diffs.append(droneDiff(oldDrone, drone))
+            updates.append(PositionAndRange(
+                droneName=drone['name'],
+                position=Vec2(x=drone['position'][0],
+                              y=drone['position'][1]),
+                yaw=drone['yaw'],
+                ranges=drone['ranges']))
+
+        if batched:
+            CommunicationService().sendToDashboardController(
+                Message(type="pulses", data=diffs), 'argos')
         else:
-            for parsedMessage in parsedMessages:
-                if parsedMessage['type'] != 'pulse':
-                    return
-
-                pulseData: dict = parsedMessage['data']
-                oldDrone = ArgosController.dronesSet.getDrone(
-                    pulseData['name'])
-                if not oldDrone:
-                    oldDrone = {}
-                pulseData: dict = {**oldDrone, **pulseData, "real": False}
-
-                drone = Drone(**pulseData)
-                ArgosController.dronesSet.setDrone(drone['name'], drone)
+            for diff in diffs:
                 CommunicationService().sendToDashboardController(
-                    Message(
-                        type="pulse",
-                        data=droneDiff(oldDrone, drone)
-                    )
-                )
+                    Message(type="pulse", data=diff), 'argos')
 
-                if ArgosController.missionHandler is not None:
-                    ArgosController.missionHandler.onReceivedPositionAndRange(
-                        drone['name'],
-                        Vec2(x=drone['position'][0], y=drone['position'][1]),
-                        drone['yaw'], drone['ranges'])
-                    if ArgosController.missionHandler.checkMissionEnd():
-                        ArgosController.missionHandler = None
+        if client.missionHandler is not None and updates:
+            client.missionHandler.onReceivedPositionsAndRanges(updates)
+            if client.missionHandler.checkMissionEnd():
+                client.missionHandler = None
 
     @staticmethod
     def onClientRaisedError(client: ArgosClient, error: Exception) -> None:
@@ -188,85 +339,109 @@ class ArgosController(metaclass=Singleton):
     @staticmethod
     def onControllerReceivedMessage(message: Message):
         """Decide what to do with the given message. It can start a mission
-        or send the message as is to the clients.
+        or send the message as is to the clients. Missions are started on
+        the simulation given in the request, or on every simulation.
 
           @param message: the message received by the controller.
         """
+        clients = list(ArgosController.clients)
         if message['type'] == 'startMission':
             missionRequestData: dict = message['data']
-            if missionRequestData['type'] == 'argos':
+            if missionRequestData['type'] != 'argos':
+                return
+            offsetDronePos = missionRequestData.get('dronesPositions', {})
+            for client in clients:
+                if 'simulation' in missionRequestData and \
+                        missionRequestData['simulation'] != client.id:
+                    continue
                 initialDronePos = {}
-                offsetDronePos = {} if 'dronesPositions' not in missionRequestData \
-                    else missionRequestData['dronesPositions']
-                for drone in ArgosController.dronesSet.getDrones().values():
+                for drone in client.dronesSet.getDrones().values():
                     initialDronePos[drone['name']] = Vec2(
                         x=drone['position'][0], y=drone['position'][1])
-                ArgosController.startMission(initialDronePos, offsetDronePos)
-                if ArgosController.missionHandler.mission['status'] == 'inProgress':
-                    for drone in ArgosController.dronesSet.getDrones().values():
-                        ArgosController.sendMessage(
-                            Message(type='startMission', data={'name': drone['name']}))
-            return
+                ArgosController.startMission(
+                    client, initialDronePos, offsetDronePos)
         elif message['type'] == 'returnToBase':
-            for drone in ArgosController.dronesSet.getDrones().values():
-                ArgosController.sendMessage(
-                    Message(type='returnToBase', data={'name': drone['name']}))
+            for client in clients:
+                ArgosController.sendMessagesToClient(client, [
+                    Message(type='returnToBase', data={'name': name})
+                    for name in client.dronesSet.getDrones()])
         elif message['type'] == 'stopMission':
-            if ArgosController.missionHandler is not None:
-                ArgosController.missionHandler.stopMission()
-                for drone in ArgosController.dronesSet.getDrones().values():
-                    ArgosController.sendMessage(
-                        Message(type='stopMission', data={'name': drone['name']}))
-                ArgosController.missionHandler = None
+            for client in clients:
+                if client.missionHandler is None:
+                    continue
+                client.missionHandler.stopMission()
+                ArgosController.sendMessagesToClient(client, [
+                    Message(type='stopMission', data={'name': name})
+                    for name in client.dronesSet.getDrones()])
+                client.missionHandler = None
 
     @staticmethod
     def sendMessage(message: Message) -> None:
-        """Sends the specified message to the client.
+        """Sends the specified message to the simulation of the drone named
+        in the message, or to every simulation for the '*' name.
 
           @param message: the message to send.
         """
-        ArgosController.sendMessageToSocket(
-            ArgosController.client.socket, message)
+        name = message['data']['name']
+        if name != '*':
+            client = ArgosController.droneClients.get(name)
+            if client is not None:
+                ArgosController.sendMessagesToClient(client, [message])
+            return
+        for client in list(ArgosController.clients):
+            ArgosController.sendMessagesToClient(client, [message])
 
     @staticmethod
-    def sendMessageToSocket(clientSocket, message: Message):
-        """Sends the specified message to the specified socket after
-        converting it from json to string.
-
-          @param clientSocket: the socket to send the message.
-          @param message: the message to send.
+    def sendMessagesToClient(client: ArgosClient,
+                             messages: List[Message]) -> None:
+        """Queues the specified messages for the client and lets the event
+        loop write them in a single buffered write. Never blocks: a client
+        whose queue is full is considered stalled and is disconnected.
+
+          @param client: the client to send the messages.
+          @param messages: the messages to send.
         """
-
-        messageStr = json.dumps(message)
-        clientSocket.send(bytes(messageStr + '\n', 'ascii'))
+        for message in messages:
+            if not client.queueMessage(message):
+                logging.error(
+                    f'ARGoS client {client.id} is not reading its messages, '
+                    f'closing it')
+                try:
+                    client.closeClient()
+                except OSError:
+                    pass
+                return
+        ArgosController.requestFlush(client)
 
     @staticmethod
-    def startMission(initialDronePos: dict, offsetDronePos: dict):
-        """Start a mission. Order drones to takeoff and initialize a mission
-        handler.
+    def startMission(client: ArgosClient, initialDronePos: dict,
+                     offsetDronePos: dict):
+        """Start a mission on the given simulation. Order drones to takeoff
+        and initialize a mission handler.
 
+          @param client: the client of the simulation.
           @param initialDronePos: the drone position at the moment of the mission creation.
           @param offsetDronePos: the drone position offset given by the dashboard.
         """
-        logging.info("START MISSION")
-        for drone in ArgosController.dronesSet.getDrones():
-            ArgosController.sendMessage(
-                Message(
-                    type='startMission',
-                    data={"name": drone}
-                )
-            )
-
-        ArgosController.missionHandler = MissionHandler(
-            dronesSet=ArgosController.dronesSet,
+        logging.info(f'START MISSION on ARGoS client {client.id}')
+        missionHandler = MissionHandler(
+            dronesSet=client.dronesSet,
             missionType='argos',
             initialDronePos=initialDronePos,
             offsetDronePos=offsetDronePos,
             sendMessageCallable=lambda m: CommunicationService().sendToDashboardController(m)
         )
+        # A rejected mission handler has no mission
+        if getattr(missionHandler, 'mission', None) is None:
+            return
+        client.missionHandler = missionHandler
+        ArgosController.sendMessagesToClient(client, [
+            Message(type='startMission', data={"name": name})
+            for name in client.dronesSet.getDrones()])
 
     @staticmethod
     def getCurrentMission() -> Optional[Mission]:
-        if ArgosController.missionHandler is not None:
-            return ArgosController.missionHandler.mission
+        for client in list(ArgosController.clients):
+            if client.missionHandler is not None:
+                return client.missionHandler.mission
         return None
@@ -1,56 +1,64 @@
 import logging
-import math
 import struct
 import threading
 import time
-from enum import IntEnum
 from threading import Thread
-from typing import Any, List, Optional, Set, Union
+from typing import Any, Dict, Iterator, List, Optional, Union
 
 import cflib.crtp
-from cflib.crtp.radiodriver import RadioManager  # noqa
+from cflib.crazyflie import platformservice
+from cflib.crtp.crtpstack import CRTPPacket, CRTPPort
 from src.clients.crazyradio_client import CrazyradioClient
 from src.metaclasses.singleton import Singleton
 from src.models.connection import HandlerType
-from src.models.drone import Drone, droneDiff
+from src.models.crazyradio_packet import PacketReceivedCode, decodePacket
+from src.models.drone import Drone, DroneState
 from src.models.message import Message
 from src.models.mission import Mission, Vec2
 from src.models.software_update import LoadProjectData, ProjectType
+from src.services.command_skew import CommandSkewTracker
 from src.services.communications import CommunicationService
 from src.services.drones_set import DronesSet
+from src.services.fleet_view import FleetView
+from src.services.ingestion_queue import IngestionQueue, IngestionStats
+from src.services.interface_scanner import InterfaceScanner
 from src.services.mission_handler import MissionHandler
 from src.services.project_loader import ProjectLoader
+from src.services.radio_shards import CrazyradioLinkDriver, RadioShards
+from src.services.uplink_scheduler import CommandLatency
 from src.utils.setup_logging import SUCCESS_LEVEL_NUM
 from src.utils.timestamp import getTimestamp
 
 
-class PacketReceivedCode(IntEnum):
-    BATTERY = 0
-    SPEED = 1
-    POSITION_AND_SENSORS = 2
-    OTHERS = 3
-
-
-class PacketSentCode(IntEnum):
-    START_MISSION = 0
-    END_MISSION = 1
-    RETURN_TO_BASE = 2
-    TAKE_OFF = 3
-    LANDING = 4
-    LED_ON = 5
-    LED_OFF = 6
-
-
 class CrazyradioController(metaclass=Singleton):
     running = True
-    dronesSet = DronesSet()
-    clients: Set[CrazyradioClient] = set()
+    dronesSet = DronesSet(FleetView())
+    clients: Dict[str, CrazyradioClient] = {}
     missionHandler: MissionHandler = None
     projectCurrentlyLoading = False
     FIRST_DRONE_ADDRESS = 0xE7E7E7E701
     MAX_DRONE_NUMBER = 2
+    SCAN_PERIOD = 5
+    CHANNEL_PER_DONGLE = False
+    RADIO_CHANNEL = 80
+    DATA_RATE = '2M'
+    # Look for the drones missing from their dongle on every channel and
+    # data rate
+    FULL_SCAN = True
+    # Only for drone firmwares listening on the broadcast address: a
+    # broadcast nobody receives fails silently
+    USE_BROADCAST = False
+    BROADCAST_COMMANDS: Dict[str, DroneState] = {
+        'startMission': 'takingOff',
+        'returnToBase': 'returningToBase',
+        'stopMission': 'landing',
+    }
+    skewTracker = CommandSkewTracker()
 
     projectLoader: ProjectLoader
+    scanner: InterfaceScanner = None
+    ingestionQueue: IngestionQueue = None
+    shards: RadioShards = None
 
     @staticmethod
     def launch() -> Thread:
@@ -59,6 +67,7 @@ class CrazyradioController(metaclass=Singleton):
 
         """
         CrazyradioController.projectLoader = ProjectLoader()
+        CrazyradioController.ingestionQueue = IngestionQueue()
 
         thread = Thread(target=CrazyradioController.launchServer)
         thread.start()
@@ -66,12 +75,17 @@ class CrazyradioController(metaclass=Singleton):
 
     @staticmethod
     def launchServer():
-        """Start the server. Scans for the dongle and wait until its is
-        connected. Scans for interface (drones) then create a client for each
-        interface found.
+        """Start the server. Scans for the dongles and wait until at least
+        one is connected. Scans for interface (drones) then create a client
+        for each interface found. Drones are spread across every dongle
+        detected.
 
         """
         cflib.crtp.init_drivers(enable_debug_driver=False)
+        CrazyradioController.shards = RadioShards(
+            CrazyradioLinkDriver(), CrazyradioController.CHANNEL_PER_DONGLE,
+            CrazyradioController.RADIO_CHANNEL, CrazyradioController.DATA_RATE,
+            CrazyradioController.FULL_SCAN)
         while not CrazyradioController.isDongleConnected() and \
                 CrazyradioController.running:
             logging.warning(
@@ -81,63 +95,67 @@ class CrazyradioController(metaclass=Singleton):
         if not CrazyradioController.running:
             return
 
-        logging.info(f"Successfully connected to Crazyradio Dongle")
+        logging.info(
+            f"Successfully connected to "
+            f"{CrazyradioController.shards.dongleCount} Crazyradio Dongle(s)")
+        first = CrazyradioController.FIRST_DRONE_ADDRESS
+        CrazyradioController.scanner = InterfaceScanner(
+            range(first, first + CrazyradioController.MAX_DRONE_NUMBER),
+            CrazyradioController.shards.probe)
         threading.Thread(target=CrazyradioController.findNewDrones).start()
 
     @staticmethod
     def findNewDrones():
-        """Try to reconnect to new drones every 5 seconds.
+        """Try to connect to new drones every 5 seconds, or as soon as a
+        rescan is requested.
 
         """
         while CrazyradioController.running:
             nDrones = len(CrazyradioController.clients)
             if not CrazyradioController.projectCurrentlyLoading and \
                     nDrones < CrazyradioController.MAX_DRONE_NUMBER:
-                interfaces = CrazyradioController.getAvailableInterfaces()
-                if len(interfaces) == 0 and \
-                        nDrones == 0:
+                nFound = 0
+                for interface in CrazyradioController.getAvailableInterfaces():
+                    CrazyradioController.handleClient(interface)
+                    nFound += 1
+                if nFound == 0 and nDrones == 0:
                     logging.warning(
                         f'No drones found nearby. Retrying in 5 seconds.')
-                for interface in interfaces:
-                    CrazyradioController.handleClient(interface)
 
-            time.sleep(5)
+            CrazyradioController.scanner.waitForRescan(
+                CrazyradioController.SCAN_PERIOD)
 
     @staticmethod
     def isDongleConnected() -> bool:
-        """Check if the dongle is connected.
+        """Check if at least one dongle is connected.
 
         """
-        crazyradioDriver = RadioManager()
-        try:
-            crazyradioDriver.open(0)
-            return True
-        except:  # noqa
-            return False
+        return CrazyradioController.shards.detectDongles() > 0
 
     @staticmethod
-    def getAvailableInterfaces() -> List:
-        """Scans for available drone connections and adds them to the list of clients.
+    def getAvailableInterfaces() -> Iterator[List]:
+        """Scans concurrently for available drone connections that are not
+        clients yet, and yields them as soon as they are found.
 
         """
-        available = []
-        first = CrazyradioController.FIRST_DRONE_ADDRESS
-        last = CrazyradioController.FIRST_DRONE_ADDRESS + \
-            CrazyradioController.MAX_DRONE_NUMBER
-
-        for address in range(first, last):
-            available = [
-                *available,
-                *cflib.crtp.scan_interfaces(address)
-            ]
-
-        allUris = set(client.uri for client in CrazyradioController.clients)
-        return list(
-            filter(
-                lambda interface: interface[0] not in allUris,
-                available
-            )
-        )
+        allUris = set(CrazyradioController.clients)
+        connected = set(CrazyradioController.getUriAddress(uri)
+                        for uri in allUris)
+        for interface in CrazyradioController.scanner.scan(connected):
+            if interface[0] not in allUris:
+                yield interface
+
+    @staticmethod
+    def getUriAddress(uri: str) -> Optional[int]:
+        """Returns the radio address of a drone uri, or None if the uri
+        doesn't contain one.
+
+          @param uri: the uri of the drone.
+        """
+        try:
+            return int(uri.rsplit('/', 1)[1], 16)
+        except (IndexError, ValueError):
+            return None
 
     @staticmethod
     def stopServer():
@@ -145,7 +163,11 @@ class CrazyradioController(metaclass=Singleton):
 
         """
         CrazyradioController.running = False
-        for client in CrazyradioController.clients:
+        if CrazyradioController.scanner is not None:
+            CrazyradioController.scanner.shutdown()
+        if CrazyradioController.ingestionQueue is not None:
+            CrazyradioController.ingestionQueue.stop()
+        for client in list(CrazyradioController.clients.values()):
             client.closeClient()
 
     @staticmethod
@@ -155,8 +177,8 @@ class CrazyradioController(metaclass=Singleton):
 
           @param interface: the interface of the new connection.
         """
-        client = CrazyradioClient()
-        CrazyradioController.clients.add(client)
+        client = CrazyradioClient(CrazyradioController.ingestionQueue)
+        CrazyradioController.clients[interface[0]] = client
         handlers = [
             [HandlerType.connection, CrazyradioController.onClientConnect],
             [HandlerType.disconnection,
@@ -174,24 +196,47 @@ class CrazyradioController(metaclass=Singleton):
 
     @staticmethod
     def onClientConnect(client: CrazyradioClient) -> None:
-        """Called by a client when it connects to its interface.
+        """Called by a client when it connects to its interface. The whole
+        drone record is sent, since the later pulses only hold the fields
+        that differ from it.
 
           @param client: the client witch called the function.
         """
         logging.log(SUCCESS_LEVEL_NUM,
                     f'New Crazyradio client connected on uri {client.uri}')
-        newDrone = Drone(
-            name=client.uri,
-            timestamp=getTimestamp()
-        )  # noqa
-        CrazyradioController.dronesSet.setDrone(client.uri, newDrone)
+        if client.drone is None:
+            CrazyradioController.createDroneRecord(client)
+        CommunicationService().registerDrone(client.uri, 'crazyradio')
         CommunicationService().sendToDashboardController(
             Message(
                 type="pulse",
-                data=newDrone
-            )
+                data={**client.drone, 'timestamp': getTimestamp()}
+            ),
+            'crazyradio'
         )
 
+    @staticmethod
+    def createDroneRecord(client: CrazyradioClient) -> None:
+        """Creates the mutable record of the drone of the client, with every
+        field set so that later updates never add keys to it. The record is
+        private to the client, the drones set only holds frozen copies.
+
+          @param client: the client of the drone.
+        """
+        client.drone = Drone(
+            name=client.uri,
+            timestamp=getTimestamp(),
+            speed=0.0,
+            battery=0.0,
+            position=[0.0, 0.0, 0.0],
+            yaw=0.0,
+            ranges=[0, 0, 0, 0],
+            state='onTheGround',
+            ledOn=False,
+            real=True
+        )  # noqa
+        CrazyradioController.dronesSet.setDrone(client.uri, client.drone)
+
     @staticmethod
     def onClientDisconnect(client: CrazyradioClient) -> None:
         """Called by a client when it disconnects from its interface. It send
@@ -201,90 +246,67 @@ class CrazyradioController(metaclass=Singleton):
           @param client: the client witch called the function.
         """
         logging.info(f'Crazyradio client disconnected from uri {client.uri}')
+        if client.uplink is not None:
+            client.uplink.stop()
+        CommunicationService().unregisterDrone(client.uri, 'crazyradio')
         if CrazyradioController.running:
-            CrazyradioController.clients.remove(client)
+            if CrazyradioController.clients.get(client.uri) is client:
+                del CrazyradioController.clients[client.uri]
             CommunicationService().sendToDashboardController(
                 Message(
                     type="disconnect",
                     data={
                         "name": client.uri
                     }
-                )
+                ),
+                'crazyradio'
             )
+            CrazyradioController.scanner.requestRescan(
+                CrazyradioController.getUriAddress(client.uri))
             # Comment to Keep the drone last state
             # CrazyradioController.dronesSet.removeDrone(client.uri)
 
     @staticmethod
     def onClientReceivedMessage(client: CrazyradioClient, data) -> None:
-        """Called by a client when it receives a message. The message is first decoded then
-        it updates the drone stored status. Finnally it sends the message
-        to the dashboards and the mission controller.
+        """Called by a client when it receives a message. The message is
+        decoded directly into the drone record, then the changed fields are
+        sent to the dashboards and the position to the mission controller.
 
           @param client: the client witch called the function.
           @param data: the data of the message in bytes received by the client.
         """
-        droneIdentifier = CrazyradioController.getDroneIdentifier(client.uri)
+        if client.drone is None:
+            CrazyradioController.createDroneRecord(client)
+        drone = client.drone
         try:
-
-            (code,) = struct.unpack_from("<B", data, 0)
-            oldDrone = CrazyradioController.dronesSet.getDrone(client.uri)
-            if not oldDrone:
-                CrazyradioController.dronesSet.setDrone(
-                    client.uri, Drone(**{'name': client.uri}))
-                return
-
-            drone: Drone
-            drone = CrazyradioController.dronesSet.getDrone(client.uri)
-            if code == PacketReceivedCode.BATTERY:
-                (cd, battery) = struct.unpack("<Bf", data)
-                drone = Drone(**{**drone, "battery": battery})
-
-            elif code == PacketReceivedCode.SPEED:
-                (cd, speed) = struct.unpack("<Bf", data)
-                drone = Drone(**{**drone, "speed": speed})
-
-            elif code == PacketReceivedCode.POSITION_AND_SENSORS:
-                (cd, positionX, positionY, positionZ, yaw, front, left,
-                 back, right, up) = struct.unpack("<BffffHHHHH", data)
-                drone = Drone(**{
-                    **drone,
-                    "position": [positionX, positionY, positionZ],
-                    "yaw": yaw * math.pi / 180,
-                    "ranges": [front, left, back, right]
-                })
-
-            elif code == PacketReceivedCode.OTHERS:
-                (cd, state, ledOn) = struct.unpack("<BB?", data)
-                drone = Drone(**{
-                    **drone,
-                    "ledOn": ledOn,
-                    "state": ["onTheGround", "takingOff", "landing", "crashed",
-                              "exploring", "standBy", "returningToBase"][state]
-                })
-
-            else:
-                logging.error("Drone received unknown code")
-
-            drone = Drone(
-                **{**drone, 'timestamp': getTimestamp(), 'real': True})
-
-            CrazyradioController.dronesSet.setDrone(client.uri, drone)
-
-        except ValueError:
+            code, changes = decodePacket(drone, data)
+        except (KeyError, IndexError):
+            logging.error(
+                f'Crazyradio client {client.uri} received unknown code : '
+                f'{data}')
+            return
+        except struct.error:
             logging.error(
-                f'Crazyradio client {droneIdentifier} receive a wrong struct '
+                f'Crazyradio client {client.uri} receive a wrong struct '
                 f'format : {data}')
-        else:
-            logging.debug(
-                f'Crazyradio client {droneIdentifier} received message : {data}')
+            return
 
-            CommunicationService().sendToDashboardController(
-                Message(
-                    type="pulse",
-                    data=droneDiff(oldDrone, drone)
-                )
-            )
-            if CrazyradioController.missionHandler is not None:
+        if 'state' in changes:
+            CrazyradioController.skewTracker.onStateChange(
+                client.uri, changes['state'])
+        drone['timestamp'] = getTimestamp()
+        changes['name'] = drone['name']
+        changes['timestamp'] = drone['timestamp']
+        CrazyradioController.dronesSet.setDrone(client.uri, drone)
+        CommunicationService().sendToDashboardController(
+            Message(
+                type="pulse",
+                data=changes
+            ),
+            'crazyradio'
+        )
+        if CrazyradioController.missionHandler is not None:
+            if code == PacketReceivedCode.POSITION_AND_SENSORS:
                 CrazyradioController.missionHandler.onReceivedPositionAndRange(
                     client.uri,
                     Vec2(x=drone['position'][0],
@@ -292,8 +314,8 @@ class CrazyradioController(metaclass=Singleton):
                     drone['yaw'],
                     drone['ranges'][:4]
                 )
-                if CrazyradioController.missionHandler.checkMissionEnd():
-                    CrazyradioController.missionHandler = None
+            if CrazyradioController.missionHandler.checkMissionEnd():
+                CrazyradioController.missionHandler = None
 
     @staticmethod
     def onClientRaisedError(client: CrazyradioClient, error: Exception) -> None:
@@ -351,19 +373,58 @@ class CrazyradioController(metaclass=Singleton):
         """
         uri = message['data']['name']
         if uri == '*':
-            for client in CrazyradioController.clients:
-                CrazyradioController.sendMessageToClient(client, message)
+            CrazyradioController.sendMessageToAll(message)
             return
 
-        client = None
-        for c in CrazyradioController.clients:
-            if c.uri == uri:
-                client = c
-                break
-        if not client:
+        client = CrazyradioController.clients.get(uri)
+        if client is None:
             return
         CrazyradioController.sendMessageToClient(client, message)
 
+    @staticmethod
+    def sendMessageToAll(message: Message) -> None:
+        """Sends the specified message to every drone. When USE_BROADCAST is
+        set, swarm commands are broadcast so every drone receives them at the
+        same time, with a fallback to one message per drone if the broadcast
+        raises.
+
+          @param message: the message to send.
+        """
+        clients = list(CrazyradioController.clients.values())
+        expectedState = CrazyradioController.BROADCAST_COMMANDS.get(
+            message['type'])
+        if expectedState is not None and CrazyradioController.USE_BROADCAST:
+            CrazyradioController.skewTracker.start(
+                message['type'], 'broadcast', expectedState,
+                [client.uri for client in clients])
+            try:
+                CrazyradioController.broadcast(message)
+                return
+            except OSError as e:
+                logging.warning(
+                    f'Broadcast of {message["type"]} failed, sending it to '
+                    f'each drone instead: {e}')
+
+        if expectedState is not None:
+            CrazyradioController.skewTracker.start(
+                message['type'], 'unicast', expectedState,
+                [client.uri for client in clients])
+        for client in clients:
+            CrazyradioController.sendMessageToClient(client, message)
+
+    @staticmethod
+    def broadcast(message: Message) -> None:
+        """Sends the command to every drone at once on the broadcast address
+        of every dongle.
+
+          @param message: the command to send.
+        """
+        command = CrazyradioClient.encodeCommand(message['type'])
+        packet = CRTPPacket()
+        packet.set_header(CRTPPort.PLATFORM, platformservice.APP_CHANNEL)
+        CrazyradioController.shards.broadcast(
+            bytes((packet.header,)) + command)
+
     @staticmethod
     def sendMessageToClient(client: CrazyradioClient, message: Message):
         """Sends the specified message to the specified client.
@@ -454,17 +515,45 @@ class CrazyradioController(metaclass=Singleton):
         """
         if CrazyradioController.projectLoader.setup(projectType, code):
             clinks = list(CrazyradioController.dronesSet.getDrones().keys())
-            crazyradioClients = set(CrazyradioController.clients)
+            crazyradioClients = set(CrazyradioController.clients.values())
             if len(crazyradioClients) == 0:
                 logging.error('No drone to flash...')
             else:
                 for client in crazyradioClients:
                     client.closeClient()
-                CrazyradioController.projectLoader.flash(clinks)
+                flashed = CrazyradioController.projectLoader.flash(
+                    clinks,
+                    maxConcurrent=CrazyradioController.shards.dongleCount,
+                    onProgress=lambda progress: CommunicationService(
+                    ).sendToDashboardController(
+                        Message(type='flashProgress', data=progress)))
+                logging.info(
+                    f'{len(flashed)} of {len(clinks)} drones flashed')
                 time.sleep(1)
                 logging.info('About to reconnect to newly flashed drones...')
         # At the end
         CrazyradioController.projectCurrentlyLoading = False
+        CrazyradioController.scanner.requestRescan()
+
+    @staticmethod
+    def getIngestionStats() -> Dict[str, IngestionStats]:
+        """Returns the depth and counters of the ingestion queue of every
+        drone, keyed by uri.
+
+        """
+        if CrazyradioController.ingestionQueue is None:
+            return {}
+        return CrazyradioController.ingestionQueue.getStats()
+
+    @staticmethod
+    def getUplinkLatencies() -> Dict[str, Dict[str, CommandLatency]]:
+        """Returns the send latency of every type of command of every drone,
+        keyed by uri.
+
+        """
+        return {client.uri: client.uplink.getLatencies()
+                for client in list(CrazyradioController.clients.values())
+                if client.uplink is not None}
 
     @staticmethod
     def getCurrentMission() -> Optional[Mission]:
@@ -1,19 +1,30 @@
-import json
+import asyncio
 import logging
-from io import StringIO
+from http import HTTPStatus
 from threading import Thread
-from typing import List, Set
+from typing import Literal, Optional, Set
+from urllib.parse import parse_qs, urlparse
 
+import websockets
 from flask import Flask
 from flask_threaded_sockets import Sockets, ThreadedWebsocketServer
 from flask_threaded_sockets.websocket import WebSocket
+from src.clients.async_dashboard_client import AsyncDashboardClient
 from src.clients.dashboard_client import DashboardClient
 from src.metaclasses.singleton import Singleton
 from src.models.connection import HandlerType
-from src.models.drone import Drone
-from src.models.message import Message
+from src.models.message import Message, MessageSource, SequencedMessage
+from src.models.mission import getMissionHeader
+from src.models.snapshot import DashboardSnapshot
+from src.services.broadcast_log import BroadcastLog
 from src.services.communications import CommunicationService
 from src.services.database import DatabaseService
+from src.services.message_encoding import EncodedFrames, decodeMessage, \
+    encodeMessage, parseEncoding
+from src.services.outbound_queue import Frame
+
+
+DashboardServerMode = Literal['threaded', 'asyncio']
 
 
 class DashboardController(metaclass=Singleton):
@@ -23,14 +34,21 @@ class DashboardController(metaclass=Singleton):
     SERVER_PORT = 5000
     webSocketServer = None
     clients: Set[DashboardClient] = set()
+    serverMode: DashboardServerMode = 'threaded'
+    loop: Optional[asyncio.AbstractEventLoop] = None
+    broadcastLog = BroadcastLog()
 
     @staticmethod
     def launch() -> Thread:
         """Launches a thread in witch the webSocket server will start,
-        and return that thread.
+        and return that thread. The server is the threaded one or the
+        asyncio one, depending on the server mode.
 
         """
-        thread = Thread(target=DashboardController.launchServer)
+        if DashboardController.serverMode == 'asyncio':
+            thread = Thread(target=DashboardController.launchAsyncServer)
+        else:
+            thread = Thread(target=DashboardController.launchServer)
         thread.start()
         return thread
 
@@ -47,14 +65,39 @@ class DashboardController(metaclass=Singleton):
         DashboardController.webSocketServer = webSocketServer
         webSocketServer.serve_forever()
 
+    @staticmethod
+    def launchAsyncServer():
+        """Start the asyncio websocket server, serving every client from a
+        single event loop, until the server is stopped.
+
+        """
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        DashboardController.loop = loop
+        webSocketServer = loop.run_until_complete(websockets.serve(
+            DashboardController.handleAsyncClient,
+            DashboardController.HOST,
+            DashboardController.SERVER_PORT,
+            process_request=DashboardController.handleAsyncHttpRequest
+        ))
+        DashboardController.webSocketServer = webSocketServer
+        loop.run_forever()
+        webSocketServer.close()
+        loop.run_until_complete(webSocketServer.wait_closed())
+        loop.close()
+
     @staticmethod
     def stopServer():
         """Closes all the clients connections, then closes the server.
 
         """
-        for client in DashboardController.clients:
+        for client in list(DashboardController.clients):
             client.closeClient()
-        DashboardController.webSocketServer.shutdown()
+        if DashboardController.serverMode == 'asyncio':
+            DashboardController.loop.call_soon_threadsafe(
+                DashboardController.loop.stop)
+        else:
+            DashboardController.webSocketServer.shutdown()
 
     @staticmethod
     def handleClient(webSocket: WebSocket):
@@ -64,6 +107,70 @@ class DashboardController(metaclass=Singleton):
           @param webSocket: the socket of the new connection.
         """
         client = DashboardClient()
+        DashboardController.registerClient(client)
+        DashboardController.applyQueryParameters(
+            client, webSocket.environ.get('QUERY_STRING', ''))
+        client.connect(webSocket)
+        client.thread.join()
+
+    @staticmethod
+    async def handleAsyncClient(webSocket, path: Optional[str] = None):
+        """Creates a client served by the event loop for the new connection.
+        Callbacks handlers are set for every event.
+
+          @param webSocket: the socket of the new connection.
+          @param path: the requested path, /dashboard and its query.
+        """
+        client = AsyncDashboardClient(DashboardController.loop)
+        DashboardController.registerClient(client)
+        DashboardController.applyQueryParameters(
+            client, urlparse(path or webSocket.path).query)
+        await client.serve(webSocket)
+
+    @staticmethod
+    async def handleAsyncHttpRequest(path: str, requestHeaders):
+        """Answers the requests of the asyncio server that are not dashboard
+        connections, like the threaded server does.
+
+          @param path: the requested path.
+          @param requestHeaders: the headers of the request.
+        """
+        path = urlparse(path).path
+        if path == '/dashboard':
+            return None
+        if path == '/':
+            return HTTPStatus.OK, [], b'Dashboard Controller'
+        return HTTPStatus.NOT_FOUND, [], b''
+
+    @staticmethod
+    def applyQueryParameters(client: DashboardClient, query: str):
+        """Applies the options requested in the query string of the
+        connection, like ?encoding=msgpack, or ?epoch=...&lastSeq=... to
+        resume after the last message received before a disconnection.
+
+          @param client: the new client.
+          @param query: the query string of the connection.
+        """
+        parameters = parse_qs(query)
+        if 'encoding' in parameters:
+            DashboardController.setEncoding(
+                client, {'encoding': parameters['encoding'][-1]})
+        if 'epoch' in parameters and 'lastSeq' in parameters:
+            try:
+                client.resumeFrom = (parameters['epoch'][-1],
+                                     int(parameters['lastSeq'][-1]))
+            except ValueError:
+                logging.error(
+                    f'Dashboard client {client.socket} sent a wrong last '
+                    f'sequence number : {parameters["lastSeq"][-1]}')
+
+    @staticmethod
+    def registerClient(client: DashboardClient):
+        """Sets the callbacks handlers of a new client and adds it to the
+        clients.
+
+          @param client: the new client.
+        """
         DashboardController.clients.add(client)
         handlers = [
             [HandlerType.connection, DashboardController.onClientConnect],
@@ -77,8 +184,6 @@ class DashboardController(metaclass=Singleton):
                 handlerFunc,
                 client
             )
-        client.connect(webSocket)
-        client.thread.join()
 
     @staticmethod
     def onClientConnect(client: DashboardClient) -> None:
@@ -88,8 +193,22 @@ class DashboardController(metaclass=Singleton):
         """
         logging.info(
             f'New Dashboard client connected on socket {client.socket}')
-        DashboardController.sendAllRobotsStatus(client.socket)
-        DashboardController.sendAllMissions(client.socket)
+        # Load the mission headers before blocking the broadcasts
+        DatabaseService.getAllMissionHeaders()
+        with DashboardController.broadcastLog.lock:
+            missedMessages = None
+            if client.resumeFrom is not None:
+                missedMessages = DashboardController.broadcastLog.getSince(
+                    *client.resumeFrom)
+            if missedMessages is None:
+                DashboardController.sendSnapshot(client)
+            else:
+                logging.info(
+                    f'Resuming Dashboard client with {len(missedMessages)} '
+                    f'missed messages')
+                for message in missedMessages:
+                    DashboardController.sendMessageToClient(client, message)
+            client.ready = True
 
     @staticmethod
     def onClientDisconnect(client: DashboardClient) -> None:
@@ -102,10 +221,12 @@ class DashboardController(metaclass=Singleton):
         DashboardController.clients.remove(client)
 
     @staticmethod
-    def onClientReceivedMessage(client: DashboardClient, message: str) -> None:
+    def onClientReceivedMessage(client: DashboardClient,
+                                message: Frame) -> None:
         """Called by a client when it receives a message. The message is
-        parsed as json, then sent to all aof the drones (physical and
-        simulated).
+        parsed as json, or with the encoding of the client for binary
+        frames, then sent to the controller owning the drone it targets, or
+        to every controller for the swarm commands.
 
           @param client: the client witch called the function.
           @param message: the message received by the client.
@@ -113,16 +234,94 @@ class DashboardController(metaclass=Singleton):
         if message is None:
             return
         try:
-            parsedMessage = json.load(StringIO(message))
+            parsedMessage = decodeMessage(message, client.encoding)
         except ValueError:
             logging.error(
-                f'Dashboard client {client.socket} receive a wrong json '
-                f'format : {message}')
+                f'Dashboard client {client.socket} receive a wrong '
+                f'{client.encoding} format : {message}')
         else:
             logging.debug(
                 f'Dashboard client {client.socket} received message : {message}')
-            CommunicationService().sendToArgosController(parsedMessage)
-            CommunicationService().sendToCrazyradioController(parsedMessage)
+            if parsedMessage['type'] == 'setEncoding':
+                DashboardController.setEncoding(client, parsedMessage['data'])
+                return
+            if parsedMessage['type'] == 'getMission':
+                DashboardController.sendMission(client, parsedMessage['data'])
+                return
+            if parsedMessage['type'] == 'setUpdateRate':
+                DashboardController.setUpdateRate(
+                    client, parsedMessage['data'])
+                return
+            if parsedMessage['type'] in ('subscribe', 'unsubscribe'):
+                DashboardController.updateSubscriptions(
+                    client, parsedMessage['type'], parsedMessage['data'])
+                return
+            CommunicationService().sendToDroneControllers(parsedMessage)
+
+    @staticmethod
+    def setEncoding(client: DashboardClient, data: dict) -> None:
+        """Set the encoding of the messages sent to the client. Json text
+        frames are sent until a binary encoding is requested.
+
+          @param client: the client witch requested the encoding.
+          @param data: the content of the message, with json, msgpack or
+          cbor in encoding.
+        """
+        encoding = parseEncoding(data.get('encoding'))
+        if encoding is None:
+            logging.error(
+                f'Dashboard client {client.socket} requested an unknown '
+                f'encoding : {data}')
+            return
+        logging.info(
+            f'Dashboard client {client.socket} requested the {encoding} '
+            f'encoding')
+        client.encoding = encoding
+
+    @staticmethod
+    def setUpdateRate(client: DashboardClient, data: dict) -> None:
+        """Set the maximum rate of the pulses sent to the client.
+
+          @param client: the client witch requested the rate.
+          @param data: the content of the message, with the maximum number
+          of updates per second in maxRate, 0 or absent for no limit.
+        """
+        maxRate = data.get('maxRate')
+        if maxRate is not None and (
+                isinstance(maxRate, bool) or
+                not isinstance(maxRate, (int, float)) or not maxRate >= 0):
+            logging.error(
+                f'Dashboard client {client.socket} requested an invalid '
+                f'update rate : {data}')
+            return
+        logging.info(
+            f'Dashboard client {client.socket} requested a maximum update '
+            f'rate of {maxRate or "unlimited"}')
+        client.setMaxRate(maxRate)
+
+    @staticmethod
+    def updateSubscriptions(client: DashboardClient, messageType: str,
+                            data: dict) -> None:
+        """Subscribe the client to topics or unsubscribe it from them.
+
+          @param client: the client witch sent the request.
+          @param messageType: 'subscribe' or 'unsubscribe'.
+          @param data: the content of the message, with the list of topics
+          in topics.
+        """
+        topics = data.get('topics')
+        if not isinstance(topics, list):
+            logging.error(
+                f'Dashboard client {client.socket} sent a {messageType} '
+                f'message without a list of topics : {data}')
+            return
+        if messageType == 'subscribe':
+            client.topics.subscribe(topics)
+        else:
+            client.topics.unsubscribe(topics)
+        logging.info(
+            f'Dashboard client {client.socket} is subscribed to '
+            f'{sorted(client.topics.topics)}')
 
     @staticmethod
     def onClientRaisedError(client: DashboardClient, error: Exception) -> None:
@@ -135,60 +334,123 @@ class DashboardController(metaclass=Singleton):
             f'Dashboard client {client.socket} raised an error:\n{error}')
 
     @staticmethod
-    def sendAllRobotsStatus(socket) -> None:
-        """Send all the information of every saved drones to the socket.
+    def sendSnapshot(client: DashboardClient) -> None:
+        """Send the status of every drone, the headers of every saved mission
+        and the current mission to the client, in a single message. The full
+        saved missions are sent on request. The snapshot carries the sequence
+        number of the last broadcast message it includes.
 
-          @param socket: the socket to send the info to.
+          @param client: the client to send the info to.
         """
+        drones = CommunicationService().getAllDrones()
+        missions = DatabaseService.getAllMissionHeaders()
+        currentMission = CommunicationService().getCurrentMission()
+        if currentMission is not None and \
+                all(m['id'] != currentMission['id'] for m in missions):
+            missions = [getMissionHeader(currentMission), *missions]
         logging.info(
-            'Sending all robots status to new Dashboard client')
-        drones: List[Drone] = CommunicationService().getAllDrones()
-        for drone in drones:
-            DashboardController.sendMessageToSocket(
-                socket,
-                Message(type="pulse", data=drone)
+            f'Sending the status of {len(drones)} drones and '
+            f'{len(missions)} missions to new Dashboard client')
+        DashboardController.sendMessageToClient(
+            client,
+            SequencedMessage(
+                type="snapshot",
+                data=DashboardSnapshot(
+                    drones=drones,
+                    missions=missions,
+                    currentMission=currentMission,
+                    epoch=DashboardController.broadcastLog.epoch
+                ),
+                seq=DashboardController.broadcastLog.lastSeq
             )
+        )
 
     @staticmethod
-    def sendAllMissions(socket) -> None:
-        """Send all the saved mission in the database to the socket.
+    def sendMission(client: DashboardClient, data: dict) -> None:
+        """Send a full mission, with its points and paths, to the client
+        witch requested it.
 
-          @param socket: the socket to send the info to.
+          @param client: the client witch requested the mission.
+          @param data: the content of the message, with the mission id in id.
         """
-        missions = DatabaseService.getAllMissions()
-        currentMission = CommunicationService().getCurrentMission()
-        if currentMission is not None:
-            missions = [*missions, currentMission]
-        logging.info(
-            f'Sending all saved missions ({len(missions)} in total) to new '
-            f'Dashboard client')
-        for mission in missions:
-            DashboardController.sendMessageToSocket(
-                socket,
-                Message(type="mission", data=mission)
-            )
+        missionId = data.get('id')
+        mission = CommunicationService().getCurrentMission()
+        if mission is None or mission['id'] != missionId:
+            mission = DatabaseService.getMission(missionId)
+        if mission is None:
+            logging.error(
+                f'Dashboard client {client.socket} requested an unknown '
+                f'mission : {missionId}')
+            return
+        DashboardController.sendMessageToClient(
+            client, Message(type="mission", data=mission))
 
     @staticmethod
-    def onControllerReceivedMessage(message: Message):
-        """Sends the given messages to all the clients.
+    def onControllerReceivedMessage(message: Message,
+                                    source: Optional[MessageSource] = None):
+        """Stamps the given message with its sequence number and queues it
+        for the clients subscribed to it. The message is encoded once per
+        encoding, and the same frame is queued for every client using it.
+        Pulses for the clients with a maximum update rate are merged by their
+        throttle instead. The messages are queued one at a time, so every
+        client receives them in the order of their sequence numbers.
 
           @param message: the message received by the controller.
+          @param source: the controller the message comes from, if any.
         """
-        for client in DashboardController.clients:
-            if client.socket is None or client.socket.closed:
-                continue
-            DashboardController.sendMessageToSocket(client.socket, message)
+        with DashboardController.broadcastLog.lock:
+            message = DashboardController.broadcastLog.append(message)
+            frames = EncodedFrames(message)
+            droppable = message['type'] in DashboardClient.DROPPABLE_TYPES
+            for client in list(DashboardController.clients):
+                if not client.ready or client.socket.closed:
+                    continue
+                filteredMessage = client.topics.filter(message, source)
+                if filteredMessage is None:
+                    continue
+                throttle = client.throttle
+                if throttle is not None:
+                    if throttle.add(filteredMessage):
+                        continue
+                    # Keep the pending updates ahead of the unthrottled
+                    # message
+                    throttle.flush(client.queueMessage)
+                if filteredMessage is not message:
+                    DashboardController.queueFrame(
+                        client,
+                        encodeMessage(filteredMessage, client.encoding),
+                        droppable)
+                    continue
+                DashboardController.queueFrame(
+                    client, frames.get(client.encoding), droppable)
 
     @staticmethod
-    def sendMessageToSocket(socket, message: Message) -> None:
-        """Sends the specified message to the specified socket after
-        converting it from json to string.
+    def sendMessageToClient(client: DashboardClient, message: Message) -> None:
+        """Queues the specified message for the specified client after
+        encoding it.
 
-          @param socket: the socket to send the message.
+          @param client: the client to send the message.
           @param message: the message to send.
         """
-        messageStr = json.dumps(message)
-        socket.send(messageStr)
+        DashboardController.queueFrame(
+            client, encodeMessage(message, client.encoding),
+            message['type'] in DashboardClient.DROPPABLE_TYPES)
+
+    @staticmethod
+    def queueFrame(client: DashboardClient, frame: Frame,
+                   droppable: bool) -> None:
+        """Queues an encoded message for the client, and disconnects the
+        client if it lags too much behind.
+
+          @param client: the client to send the message.
+          @param frame: the encoded message.
+          @param droppable: whether the message may be dropped.
+        """
+        if client.queueFrame(frame, droppable):
+            return
+        logging.warning(
+            f'Dashboard client {client.socket} is too slow, disconnecting it')
+        client.closeClient()
 
 
 @DashboardController.sockets.route('/dashboard')
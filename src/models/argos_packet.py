@@ -0,0 +1,69 @@
+import struct
+from enum import IntEnum
+from typing import Iterator, List, Literal
+
+from src.models.drone import DRONE_STATES, Drone
+
+PulseFormat = Literal['json', 'binary']
+
+
+class ArgosPacketCode(IntEnum):
+    PULSE = 0
+    PULSES = 1
+
+
+# code, name, timestamp, speed, battery, position (x, y, z), yaw,
+# ranges (front, left, back, right), state, ledOn
+PULSE_STRUCT = struct.Struct('<B24sI6f4HB?')
+# code, number of pulse frames following the header
+PULSES_HEADER_STRUCT = struct.Struct('<BH')
+
+
+def decodePulses(frames: bytes) -> Iterator[Drone]:
+    """Decode consecutive binary pulse frames into drone pulses.
+
+      @param frames: a whole number of binary pulse frames.
+    """
+    for (code, name, timestamp, speed, battery, x, y, z, yaw, front, left,
+         back, right, state, ledOn) in PULSE_STRUCT.iter_unpack(frames):
+        if code != ArgosPacketCode.PULSE:
+            raise ValueError(f'Unknown ARGoS packet code {code}')
+        yield Drone(
+            name=name.rstrip(b'\0').decode('utf-8'),
+            timestamp=timestamp,
+            speed=speed,
+            battery=battery,
+            position=[x, y, z],
+            yaw=yaw,
+            ranges=[front, left, back, right],
+            state=DRONE_STATES[state],
+            ledOn=ledOn
+        )  # noqa
+
+
+def encodePulses(drones: List[Drone]) -> bytes:
+    """Encode the pulses of one simulation tick as a single binary frame.
+
+      @param drones: the drone pulses of the tick.
+    """
+    return PULSES_HEADER_STRUCT.pack(ArgosPacketCode.PULSES, len(drones)) + \
+        b''.join(encodePulse(drone) for drone in drones)
+
+
+def encodePulse(drone: Drone) -> bytes:
+    """Encode a drone pulse as a binary frame, like ARGoS does.
+
+      @param drone: the drone pulse to encode.
+    """
+    return PULSE_STRUCT.pack(
+        ArgosPacketCode.PULSE,
+        drone['name'].encode('utf-8'),
+        drone['timestamp'],
+        drone['speed'],
+        drone['battery'],
+        *drone['position'],
+        drone['yaw'],
+        *drone['ranges'],
+        DRONE_STATES.index(drone['state']),
+        drone['ledOn']
+    )
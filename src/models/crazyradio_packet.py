@@ -0,0 +1,89 @@
+import math
+import struct
+from enum import IntEnum
+from typing import Callable, Dict, Tuple
+
+from src.models.drone import DRONE_STATES, Drone
+
+
+class PacketReceivedCode(IntEnum):
+    BATTERY = 0
+    SPEED = 1
+    POSITION_AND_SENSORS = 2
+    OTHERS = 3
+
+
+class PacketSentCode(IntEnum):
+    START_MISSION = 0
+    END_MISSION = 1
+    RETURN_TO_BASE = 2
+    TAKE_OFF = 3
+    LANDING = 4
+    LED_ON = 5
+    LED_OFF = 6
+
+
+BATTERY_STRUCT = struct.Struct('<Bf')
+SPEED_STRUCT = struct.Struct('<Bf')
+POSITION_AND_SENSORS_STRUCT = struct.Struct('<BffffHHHHH')
+OTHERS_STRUCT = struct.Struct('<BB?')
+
+
+def setField(drone: Drone, changes: dict, key: str, value) -> None:
+    """Update a field of the drone record only if its value changed, and
+    note the change.
+
+      @param drone: the mutable drone record.
+      @param changes: the changed fields.
+      @param key: the field to update.
+      @param value: the received value.
+    """
+    if drone.get(key) != value:
+        drone[key] = value
+        changes[key] = value
+
+
+def decodeBattery(drone: Drone, data: bytes, changes: dict) -> None:
+    (code, battery) = BATTERY_STRUCT.unpack(data)
+    setField(drone, changes, 'battery', battery)
+
+
+def decodeSpeed(drone: Drone, data: bytes, changes: dict) -> None:
+    (code, speed) = SPEED_STRUCT.unpack(data)
+    setField(drone, changes, 'speed', speed)
+
+
+def decodePositionAndSensors(drone: Drone, data: bytes, changes: dict) -> None:
+    (code, positionX, positionY, positionZ, yaw, front, left, back, right,
+     up) = POSITION_AND_SENSORS_STRUCT.unpack(data)
+    setField(drone, changes, 'position', [positionX, positionY, positionZ])
+    setField(drone, changes, 'yaw', yaw * math.pi / 180)
+    setField(drone, changes, 'ranges', [front, left, back, right])
+
+
+def decodeOthers(drone: Drone, data: bytes, changes: dict) -> None:
+    (code, state, ledOn) = OTHERS_STRUCT.unpack(data)
+    setField(drone, changes, 'ledOn', ledOn)
+    setField(drone, changes, 'state', DRONE_STATES[state])
+
+
+PACKET_DECODERS: Dict[int, Callable[[Drone, bytes, dict], None]] = {
+    PacketReceivedCode.BATTERY: decodeBattery,
+    PacketReceivedCode.SPEED: decodeSpeed,
+    PacketReceivedCode.POSITION_AND_SENSORS: decodePositionAndSensors,
+    PacketReceivedCode.OTHERS: decodeOthers,
+}
+
+
+def decodePacket(drone: Drone, data: bytes) -> Tuple[int, dict]:
+    """Decode an appchannel packet into the mutable drone record. Returns the
+    packet code and the fields that changed. Raises KeyError for an unknown
+    code and struct.error for a packet of the wrong size.
+
+      @param drone: the mutable drone record.
+      @param data: the packet received from the drone.
+    """
+    code = data[0]
+    changes = {}
+    PACKET_DECODERS[code](drone, data, changes)
+    return code, changes
@@ -3,6 +3,10 @@ from typing import List, Literal, TypedDict
 DroneState = Literal["onTheGround", "takingOff", "landing", "crashed",
                      "exploring", "standBy", "returningToBase"]
 
+DRONE_STATES: List[DroneState] = ["onTheGround", "takingOff", "landing",
+                                  "crashed", "exploring", "standBy",
+                                  "returningToBase"]
+
 
 class Drone(TypedDict):
     name: str
@@ -18,6 +22,44 @@ class Drone(TypedDict):
     real: bool
 
 
+class FrozenDrone(dict):
+    """Read only state of a drone, safe to share between threads. Its lists
+    are stored as tuples, it can not be modified, and copying it returns the
+    drone itself.
+    """
+
+    def __init__(self, drone: dict) -> None:
+        """Freeze the attributes of a drone.
+
+          @param drone: the drone to freeze, left untouched.
+        """
+        super().__init__({
+            key: tuple(value) if isinstance(value, list) else value
+            for key, value in drone.items()
+        })
+
+    def raiseReadOnly(self, *args, **kwargs):
+        raise TypeError('A frozen drone can not be modified')
+
+    __setitem__ = raiseReadOnly
+    __delitem__ = raiseReadOnly
+    __ior__ = raiseReadOnly
+    clear = raiseReadOnly
+    pop = raiseReadOnly
+    popitem = raiseReadOnly
+    setdefault = raiseReadOnly
+    update = raiseReadOnly
+
+    def __copy__(self) -> 'FrozenDrone':
+        return self
+
+    def __deepcopy__(self, memo: dict) -> 'FrozenDrone':
+        return self
+
+    def __reduce__(self):
+        return FrozenDrone, (dict(self),)
+
+
 def droneDiff(oldDrone: Drone, newDrone: Drone) -> dict:
     diff = {}
     for oldAttribute in oldDrone:
@@ -2,6 +2,7 @@ from typing import TypedDict, Literal
 
 MessageType = Literal[
     'pulse',
+    'pulses',
     'land',
     'takeOff',
     'lighten',
@@ -14,9 +15,28 @@ MessageType = Literal[
     'stopMission',
     'loadProject',
     'loadProjectLog',
+    'flashProgress',
+    'hello',
+    'setUpdateRate',
+    'subscribe',
+    'unsubscribe',
+    'setEncoding',
+    'snapshot',
+    'getMission',
+    'saveMission',
 ]
 
+MessageSource = Literal['argos', 'crazyradio']
+
+ControllerTopic = Literal['dashboard', 'argos', 'crazyradio']
+
+MessageEncoding = Literal['json', 'msgpack', 'cbor']
+
 
 class Message(TypedDict):
     type: MessageType
     data: dict
+
+
+class SequencedMessage(Message, total=False):
+    seq: int
@@ -32,3 +32,21 @@ class Mission(TypedDict):
 
 class MissionPulse(Mission, total=False):
     pass
+
+
+class MissionHeader(TypedDict):
+    id: str
+    status: MissionStatus
+    timestamp: int
+    type: MissionType
+    drones: MissionDrones
+
+
+def getMissionHeader(mission: Mission) -> MissionHeader:
+    return MissionHeader(
+        id=mission['id'],
+        status=mission['status'],
+        timestamp=mission['timestamp'],
+        type=mission['type'],
+        drones=mission['drones']
+    )
@@ -0,0 +1,11 @@
+from typing import List, Optional, Tuple, TypedDict
+
+from src.models.drone import Drone
+from src.models.mission import Mission, MissionHeader
+
+
+class DashboardSnapshot(TypedDict):
+    drones: Tuple[Drone, ...]
+    missions: List[MissionHeader]
+    currentMission: Optional[Mission]
+    epoch: str
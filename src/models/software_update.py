@@ -13,3 +13,13 @@ class LoadProjectLog(TypedDict):
     type: LogType
     log: str
     timestamp: int
+
+
+FlashStatus = Literal['waiting', 'flashing', 'retrying', 'success', 'failed']
+
+
+class FlashProgress(TypedDict):
+    name: str
+    status: FlashStatus
+    progress: int
+    attempt: int
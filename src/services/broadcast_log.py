@@ -0,0 +1,59 @@
+import itertools
+import uuid
+from collections import deque
+from threading import RLock
+from typing import Deque, List, Optional
+
+from src.models.message import Message, SequencedMessage
+
+
+class BroadcastLog:
+    """Stamp the messages broadcast to the dashboards with increasing
+    sequence numbers and keep the most recent ones, so that a dashboard
+    reconnecting shortly after a disconnection only receives what it missed.
+    The epoch changes at every start of the server, since the sequence
+    numbers start over.
+    """
+    MAX_MESSAGES = 4096
+
+    def __init__(self, maxMessages: int = MAX_MESSAGES) -> None:
+        """Initialize an empty log.
+
+          @param maxMessages: the number of messages kept for the reconnecting
+          dashboards.
+        """
+        self.epoch = uuid.uuid4().hex[:8]
+        self.lastSeq = 0
+        self.messages: Deque[SequencedMessage] = deque(maxlen=maxMessages)
+        self.lock = RLock()
+
+    def append(self, message: Message) -> SequencedMessage:
+        """Stamp the message with the next sequence number and keep it.
+
+          @param message: the message to broadcast.
+        """
+        with self.lock:
+            self.lastSeq += 1
+            sequencedMessage = SequencedMessage(**message, seq=self.lastSeq)
+            self.messages.append(sequencedMessage)
+            return sequencedMessage
+
+    def getSince(self, epoch: str,
+                 lastSeq: int) -> Optional[List[SequencedMessage]]:
+        """Returns the messages following the last one seen by a dashboard,
+        or None if some of them are no longer kept or if the dashboard saw
+        messages of another epoch.
+
+          @param epoch: the epoch of the last message seen.
+          @param lastSeq: the sequence number of the last message seen.
+        """
+        with self.lock:
+            if epoch != self.epoch or lastSeq > self.lastSeq:
+                return None
+            nMissed = self.lastSeq - lastSeq
+            if nMissed > len(self.messages):
+                return None
+            if nMissed == 0:
+                return []
+            return list(itertools.islice(
+                self.messages, len(self.messages) - nMissed, None))
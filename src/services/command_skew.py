@@ -0,0 +1,80 @@
+import logging
+import time
+from threading import Lock
+from typing import Dict, Iterable, Optional, TypedDict
+
+from src.models.drone import DroneState
+
+
+class CommandSkew(TypedDict):
+    command: str
+    method: str
+    nDrones: int
+    first: float
+    last: float
+    skew: float
+
+
+class CommandSkewTracker:
+    """Measure, for a command sent to the whole fleet, the delay until each
+    drone reports the state the command leads to, and the spread of these
+    delays across the fleet.
+    """
+    TIMEOUT = 10
+
+    def __init__(self) -> None:
+        self.lock = Lock()
+        self.command = ''
+        self.method = ''
+        self.expectedState: Optional[DroneState] = None
+        self.sentAt = 0.0
+        self.delays: Dict[str, float] = {}
+        self.pending = set()
+        self.lastSkew: Optional[CommandSkew] = None
+
+    def start(self, command: str, method: str, expectedState: DroneState,
+              names: Iterable[str]) -> None:
+        """Start measuring a command that was just sent.
+
+          @param command: the type of the command.
+          @param method: how the command was sent, broadcast or unicast.
+          @param expectedState: the state the drones switch to.
+          @param names: the drones that received the command.
+        """
+        with self.lock:
+            self.command = command
+            self.method = method
+            self.expectedState = expectedState
+            self.sentAt = time.monotonic()
+            self.delays = {}
+            self.pending = set(names)
+
+    def onStateChange(self, name: str, state: DroneState) -> None:
+        """Record the delay of a drone if it reached the expected state.
+        Reports the skew once every drone did.
+
+          @param name: the name of the drone.
+          @param state: the new state of the drone.
+        """
+        with self.lock:
+            if state != self.expectedState or name not in self.pending:
+                return
+            delay = time.monotonic() - self.sentAt
+            if delay > CommandSkewTracker.TIMEOUT:
+                self.pending.clear()
+                return
+            self.pending.discard(name)
+            self.delays[name] = delay
+            if self.pending:
+                return
+            self.lastSkew = CommandSkew(
+                command=self.command,
+                method=self.method,
+                nDrones=len(self.delays),
+                first=min(self.delays.values()),
+                last=max(self.delays.values()),
+                skew=max(self.delays.values()) - min(self.delays.values()))
+        logging.info(
+            f'{self.lastSkew["command"]} ({self.lastSkew["method"]}) reached '
+            f'{self.lastSkew["nDrones"]} drones with a skew of '
+            f'{self.lastSkew["skew"] * 1000:.0f} ms')
@@ -1,12 +1,16 @@
-from typing import List, Optional
+import logging
+from typing import Dict, Optional, Tuple
 
 from src.metaclasses.singleton import Singleton
 from src.models.drone import Drone
-from src.models.message import Message
+from src.models.message import Message, MessageSource
 from src.models.mission import Mission
+from src.services.fleet_view import FleetSnapshot, FleetView
+from src.services.message_bus import BusStats, MessageBus
 
 
 class CommunicationService(metaclass=Singleton):
+    MERGEABLE_TYPES = {'pulse', 'pulses'}
 
     def __init__(self):
         """Initialize the communication service. The controllers are set to
@@ -15,9 +19,13 @@ class CommunicationService(metaclass=Singleton):
         self.dashboardController = None
         self.argosController = None
         self.crazyradioController = None
+        self.bus = MessageBus()
+        self.droneOwners: Dict[str, MessageSource] = {}
 
     def registerControllers(self, dashboard, argos, crazyradio) -> None:
-        """Register the controller to the specified values.
+        """Register the controller to the specified values, and subscribe
+        each of them to its topic of the bus. The messages sent to a
+        controller are then handled by its own dispatcher thread.
 
           @param dashboard: the object of the dashboard controller.
           @param argos: the object of the argos controller.
@@ -26,30 +34,129 @@ class CommunicationService(metaclass=Singleton):
         self.dashboardController = dashboard
         self.argosController = argos
         self.crazyradioController = crazyradio
+        self.bus.subscribe('dashboard', 'dashboard',
+                           dashboard.onControllerReceivedMessage,
+                           merge=CommunicationService.mergePulses)
+        self.bus.subscribe('argos', 'argos', argos.onControllerReceivedMessage)
+        self.bus.subscribe('crazyradio', 'crazyradio',
+                           crazyradio.onControllerReceivedMessage)
 
-    def sendToDashboardController(self, message: Message):
-        """Send the message to the dashboard controller.
+    def sendToDashboardController(self, message: Message,
+                                  source: Optional[MessageSource] = None):
+        """Send the message to the dashboard controller. The pending pulses
+        are merged by drone if the dashboard controller lags behind, and the
+        other messages wait for room.
           @param message: the message to send.
+          @param source: the controller the message comes from, used to
+          route drones messages to the subscribed dashboards.
         """
-        self.dashboardController.onControllerReceivedMessage(message)
+        self.bus.publish(
+            'dashboard', message, source,
+            mergeable=message['type'] in CommunicationService.MERGEABLE_TYPES)
+
+    @staticmethod
+    def mergePulses(first: Tuple, second: Tuple) -> Optional[Tuple]:
+        """Merge two pulse messages of the same controller into one pulses
+        message, with one diff per drone holding the last value of every
+        changed attribute. Returns None if they come from different
+        controllers or hold a diff without a drone name.
+
+          @param first: the message published first, and its source.
+          @param second: the message published next, and its source.
+        """
+        if first[1] != second[1]:
+            return None
+        drones: Dict[str, dict] = {}
+        for message, _ in (first, second):
+            diffs = [message['data']] if message['type'] == 'pulse' \
+                else message['data']
+            for diff in diffs:
+                if 'name' not in diff:
+                    return None
+                pending = drones.get(diff['name'])
+                drones[diff['name']] = dict(diff) if pending is None \
+                    else {**pending, **diff}
+        return Message(type='pulses', data=list(drones.values())), first[1]
 
     def sendToArgosController(self, message: Message):
-        """Send the message to the argos controller.
+        """Send the message to the argos controller. Waits while its inbox
+        is full.
           @param message: the message to send.
         """
-        self.argosController.onControllerReceivedMessage(message)
+        self.bus.publish('argos', message)
 
     def sendToCrazyradioController(self, message: Message):
-        """Send the message to the crazyradio controller.
+        """Send the message to the crazyradio controller. Waits while its
+        inbox is full.
+          @param message: the message to send.
+        """
+        self.bus.publish('crazyradio', message)
+
+    def registerDrone(self, name: str, owner: MessageSource) -> None:
+        """Record the controller owning a drone, so that the commands for
+        this drone are only sent to that controller.
+
+          @param name: the name of the drone.
+          @param owner: the controller owning the drone.
+        """
+        self.droneOwners[name] = owner
+
+    def unregisterDrone(self, name: str, owner: MessageSource) -> None:
+        """Forget the owner of a disconnected drone, unless another controller
+        took it over.
+
+          @param name: the name of the drone.
+          @param owner: the controller that owned the drone.
+        """
+        if self.droneOwners.get(name) == owner:
+            del self.droneOwners[name]
+
+    def sendToDroneControllers(self, message: Message):
+        """Send a message from a dashboard to the controller owning the drone
+        named in the message. Messages for every drone ('*') or without a
+        drone name, like missions, are sent to every controller.
           @param message: the message to send.
         """
-        self.crazyradioController.onControllerReceivedMessage(message)
+        data = message.get('data')
+        name = data.get('name') if isinstance(data, dict) else None
+        if name is None or name == '*':
+            self.sendToArgosController(message)
+            self.sendToCrazyradioController(message)
+            return
+        owner = self.droneOwners.get(name) or FleetView().getOwner(name)
+        if owner == 'argos':
+            self.sendToArgosController(message)
+        elif owner == 'crazyradio':
+            self.sendToCrazyradioController(message)
+        else:
+            logging.warning(
+                f'No controller owns the drone {name}, '
+                f'{message["type"]} not sent')
+
+    def getBusStats(self) -> Dict[str, BusStats]:
+        """Returns the depth of the inbox and the dispatch latency of every
+        controller.
+
+        """
+        return self.bus.getStats()
 
-    def getAllDrones(self) -> List[Drone]:
+    def stop(self) -> None:
+        """Stop the dispatcher threads of the controllers.
+
+        """
+        self.bus.stop()
+
+    def getAllDrones(self) -> Tuple[Drone, ...]:
         """Get all the drone saved across the argos and crazyradio controller.
+        The drones are shared with the other readers and must not be modified.
+        """
+        return FleetView().getSnapshot()['drones']
+
+    def getFleetSnapshot(self) -> FleetSnapshot:
+        """Get all the drones with the version of the fleet, witch increases
+        at every change of a drone.
         """
-        return list(self.argosController.dronesSet.getDrones().values()) +\
-            list(self.crazyradioController.dronesSet.getDrones().values())
+        return FleetView().getSnapshot()
 
     def getCurrentMission(self) -> Optional[Mission]:
         """Returns the current active mission.
@@ -0,0 +1,241 @@
+import logging
+import multiprocessing
+from copy import deepcopy
+import signal
+from itertools import combinations
+from multiprocessing.connection import Connection
+from threading import Thread
+from typing import Callable, Dict, List, Optional
+
+from src.models.message import ControllerTopic, Message
+from src.models.mission import Mission
+from src.services.communications import CommunicationService
+from src.services.database import DatabaseService
+from src.services.drone_table import DroneTable
+from src.services.fleet_view import FleetView
+
+CONTROLLER_TOPICS: List[ControllerTopic] = ['dashboard', 'argos', 'crazyradio']
+
+
+class RemoteController:
+    """Stands for a controller running in another process. The messages sent
+    to it are forwarded through the pipe to its process, and the messages it
+    sends back are dispatched to the controller of this process. Its current
+    mission is mirrored from the mission messages it sends.
+    """
+
+    def __init__(self, topic: ControllerTopic, connection: Connection) -> None:
+        """Initialize the controller of another process.
+
+          @param topic: the topic of the controller on the bus.
+          @param connection: the end of the pipe to its process.
+        """
+        self.topic = topic
+        self.connection = connection
+        self.connected = True
+        self.mission: Optional[Mission] = None
+
+    def onControllerReceivedMessage(self, *args) -> None:
+        """Forward a message to the process of the controller. Called by the
+        dispatcher thread of the controller, so the pipe has a single writer.
+
+          @param args: the message and its source, if any.
+        """
+        if not self.connected:
+            return
+        try:
+            self.connection.send(args)
+        except (OSError, ValueError) as e:
+            # Logged once, the logs may be forwarded through this pipe
+            self.connected = False
+            logging.error(f'Could not forward a message to the {self.topic} '
+                          f'controller process: {e}')
+
+    def receiveMessages(self, dispatch: Callable) -> None:
+        """Dispatch the messages sent by the controller until its process
+        closes the pipe. The missions it saves are written to the database by
+        this process.
+
+          @param dispatch: the function sending a message to the controller
+          of this process.
+        """
+        while True:
+            try:
+                args = self.connection.recv()
+            except (EOFError, OSError):
+                logging.info(f'The {self.topic} controller process closed '
+                             f'its pipe')
+                return
+            if args[0]['type'] == 'saveMission':
+                DatabaseService.saveMission(args[0]['data']['id'],
+                                            args[0]['data']['mission'])
+                continue
+            self.mirrorMission(args[0])
+            dispatch(*args)
+
+    def mirrorMission(self, message: Message) -> None:
+        """Keep a copy of the mission run by the controller from its mission
+        messages. Every update builds a new mission, so that readers never
+        see it change.
+
+          @param message: a message sent by the controller.
+        """
+        if message['type'] == 'mission':
+            self.mission = message['data']
+            return
+        mission = self.mission
+        missionPulse = message['data']
+        if message['type'] != 'missionPulse' or mission is None or \
+                missionPulse.get('id') != mission['id']:
+            return
+        mission = {**mission, **missionPulse}
+        if 'dronesPositions' in missionPulse:
+            mission['dronesPositions'] = {**self.mission['dronesPositions'],
+                                          **missionPulse['dronesPositions']}
+            mission['dronesPaths'] = {
+                name: [*path, missionPulse['dronesPositions'][name]]
+                if name in missionPulse['dronesPositions'] else path
+                for name, path in self.mission['dronesPaths'].items()
+            }
+        if 'points' in missionPulse:
+            mission['points'] = [*self.mission['points'],
+                                 *missionPulse['points']]
+        if mission['status'] in ('done', 'failed'):
+            # The controller saved the mission before sending its end
+            DatabaseService.reloadMissionHeaders()
+            mission = None
+        self.mission = mission
+
+    def getCurrentMission(self) -> Optional[Mission]:
+        """Returns the mission in progress of the controller, if any.
+
+        """
+        return self.mission
+
+
+def connectController(topic: ControllerTopic, controller,
+                      connections: Dict[ControllerTopic, Connection]) -> None:
+    """Register the controller of this process and the controllers of the
+    other processes to the communication service, then start dispatching the
+    messages received from the other processes. Only the dashboard process
+    writes the database, since every TinyDB instance rewrites the whole file:
+    the other processes send it the missions to save.
+
+      @param topic: the topic of the controller of this process.
+      @param controller: the controller of this process.
+      @param connections: the ends of the pipes to the other processes.
+    """
+    communications = CommunicationService()
+    controllers = {
+        otherTopic: RemoteController(otherTopic, connection)
+        for otherTopic, connection in connections.items()
+    }
+    controllers[topic] = controller
+    communications.registerControllers(
+        controllers['dashboard'],
+        controllers['argos'],
+        controllers['crazyradio']
+    )
+    dispatch = {
+        'dashboard': communications.sendToDashboardController,
+        'argos': communications.sendToArgosController,
+        'crazyradio': communications.sendToCrazyradioController,
+    }[topic]
+    if topic != 'dashboard':
+        def sendMission(missionId: str, mission: Mission) -> None:
+            communications.sendToDashboardController(Message(
+                type='saveMission',
+                data={'id': missionId, 'mission': deepcopy(mission)}))
+        DatabaseService.missionWriter = sendMission
+    for remoteController in controllers.values():
+        if isinstance(remoteController, RemoteController):
+            Thread(target=remoteController.receiveMessages, args=(dispatch,),
+                   name=f'pipe-{remoteController.topic}', daemon=True).start()
+
+
+class ControllerProcesses:
+    """Runs every controller in its own process, so that they do not share a
+    single interpreter lock. Every pair of processes is linked by a pipe, and
+    the drones are shared through a drone table. The processes are forked, so
+    they inherit the configuration of the controllers.
+    """
+
+    def __init__(self, controllers: Dict[ControllerTopic, object]) -> None:
+        """Create the drone table and the pipes of the processes.
+
+          @param controllers: the controller of every topic.
+        """
+        self.controllers = controllers
+        self.table = DroneTable()
+        self.processes: Dict[ControllerTopic, multiprocessing.Process] = {}
+        self.connections: Dict[ControllerTopic,
+                               Dict[ControllerTopic, Connection]] = {
+            topic: {} for topic in CONTROLLER_TOPICS}
+        for first, second in combinations(CONTROLLER_TOPICS, 2):
+            firstEnd, secondEnd = multiprocessing.Pipe()
+            self.connections[first][second] = firstEnd
+            self.connections[second][first] = secondEnd
+
+    def launch(self) -> None:
+        """Start the process of every controller. The parent process keeps
+        no end of the pipes.
+
+        """
+        context = multiprocessing.get_context('fork')
+        for topic in CONTROLLER_TOPICS:
+            process = context.Process(target=self.run, args=(topic,),
+                                      name=f'{topic}-controller')
+            process.start()
+            self.processes[topic] = process
+        for connections in self.connections.values():
+            for connection in connections.values():
+                connection.close()
+
+    def run(self, topic: ControllerTopic) -> None:
+        """Entry point of a controller process. Runs the controller until the
+        parent process terminates it.
+
+          @param topic: the topic of the controller of this process.
+        """
+        controller = self.controllers[topic]
+
+        def stopController(sig, frame):
+            controller.stopServer()
+            CommunicationService().stop()
+
+        # Only the parent process handles the interruptions, and terminates
+        # its children
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, stopController)
+
+        # Close the inherited ends of the pipes of the other processes, so
+        # that a pipe is closed as soon as one of its processes stops
+        for otherTopic, connections in self.connections.items():
+            if otherTopic != topic:
+                for connection in connections.values():
+                    connection.close()
+
+        FleetView().attachTable(
+            self.table, None if topic == 'dashboard' else topic)
+        connectController(topic, controller, self.connections[topic])
+        controller.launch().join()
+        self.table.close()
+
+    def stop(self) -> None:
+        """Ask every controller process to stop.
+
+        """
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+
+    def join(self) -> None:
+        """Wait for every controller process to stop, then free the drone
+        table.
+
+        """
+        for process in self.processes.values():
+            process.join()
+        self.table.close()
+        self.table.unlink()
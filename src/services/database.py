@@ -1,8 +1,9 @@
 import logging
-from typing import List
+from threading import Lock
+from typing import Callable, Dict, List, Optional
 
 from src.metaclasses.singleton import Singleton
-from src.models.mission import Mission
+from src.models.mission import Mission, MissionHeader, getMissionHeader
 from tinydb import Query, TinyDB
 
 
@@ -12,6 +13,12 @@ class DatabaseService(metaclass=Singleton):
         db = TinyDB('data/db.json')
     except:
         db = TinyDB('data/db2.json')
+    missionHeaders: Optional[Dict[str, MissionHeader]] = None
+    missionHeadersLock = Lock()
+    # TinyDB rewrites the whole file on every write
+    writeLock = Lock()
+    # Set in the processes that must not write the database themselves
+    missionWriter: Optional[Callable[[str, Mission], None]] = None
 
     @staticmethod
     def getAllMissions() -> List[Mission]:
@@ -27,6 +34,45 @@ class DatabaseService(metaclass=Singleton):
             logging.error("Error while reading database")
             return []
 
+    @staticmethod
+    def getAllMissionHeaders() -> List[MissionHeader]:
+        """Return the headers of the saved missions, without their points and
+        paths, sorted by their timestamp. The headers are read from the
+        database once, then kept up to date by saveMission.
+        """
+        with DatabaseService.missionHeadersLock:
+            if DatabaseService.missionHeaders is None:
+                DatabaseService.missionHeaders = {
+                    mission['id']: getMissionHeader(mission)
+                    for mission in DatabaseService.getAllMissions()
+                }
+            headers = list(DatabaseService.missionHeaders.values())
+        return sorted(headers, key=lambda m: m['timestamp'], reverse=True)
+
+    @staticmethod
+    def reloadMissionHeaders() -> None:
+        """Forget the cached headers, so that they are read again from the
+        database, after a mission was saved by another process.
+        """
+        with DatabaseService.missionHeadersLock:
+            DatabaseService.missionHeaders = None
+
+    @staticmethod
+    def getMission(missionId: str) -> Optional[Mission]:
+        """Return the saved mission with the specified id, or None if there is
+        none.
+
+          @param missionId: the str id of the mission.
+        """
+        try:
+            table = DatabaseService.db.table(
+                DatabaseService.MISSIONS_TABLE_NAME)
+            missionQuery = Query()
+            return table.get(missionQuery.id == missionId)
+        except:
+            logging.error("Error while reading database")
+            return None
+
     @staticmethod
     def saveMission(missionId: str, mission: Mission):
         """Save the specified mission into the database. Update the value of the mission id if it already exists.
@@ -34,10 +80,30 @@ class DatabaseService(metaclass=Singleton):
           @param missionId: the str id of the mission to save/update
           @param mission: the data of the mission to save
         """
+        if DatabaseService.missionWriter is not None:
+            DatabaseService.missionWriter(missionId, mission)
+            DatabaseService.reloadMissionHeaders()
+            return
         try:
             table = DatabaseService.db.table(
                 DatabaseService.MISSIONS_TABLE_NAME)
             missionQuery = Query()
-            table.upsert(mission, missionQuery.id == missionId)
+            with DatabaseService.writeLock:
+                table.upsert(mission, missionQuery.id == missionId)
         except:
             logging.error('Error while saving in the DB')
+            return
+        with DatabaseService.missionHeadersLock:
+            if DatabaseService.missionHeaders is None:
+                return
+            savedMission = {
+                **DatabaseService.missionHeaders.get(missionId, {}),
+                **mission
+            }
+            try:
+                DatabaseService.missionHeaders[missionId] = \
+                    getMissionHeader(savedMission)
+            except KeyError:
+                # Partial update of a mission saved before the cache was
+                # loaded, reload the headers on the next read
+                DatabaseService.missionHeaders = None
@@ -0,0 +1,214 @@
+import logging
+import struct
+from multiprocessing.shared_memory import SharedMemory
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from src.models.drone import DRONE_STATES, Drone, FrozenDrone
+from src.models.message import MessageSource
+
+# Sequence number of the slot, odd while the slot is being written
+SEQ_STRUCT = struct.Struct('<I')
+# used, name, timestamp, speed, battery, position (x, y, z), yaw,
+# ranges (front, left, back, right), state, ledOn, real
+DRONE_STRUCT = struct.Struct('<?64sqdd3dd4iB??')
+# Number of changes of the range of an owner
+VERSION_STRUCT = struct.Struct('<Q')
+SLOT_SIZE = SEQ_STRUCT.size + DRONE_STRUCT.size
+EMPTY_SLOT = DRONE_STRUCT.pack(False, b'', 0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0,
+                               0, 0, 0, 0, 0, False, False)
+
+
+class DroneTable:
+    """Fixed layout table of drones in shared memory, shared by the controller
+    processes. Every owner has its own range of slots, written only by the
+    process of its controller, and any process can read every range. Each slot
+    is protected by a sequence lock: the writer makes its sequence number odd
+    while it writes, and readers retry until they read the same even number
+    before and after the slot.
+    """
+    RANGES: Dict[MessageSource, int] = {'argos': 256, 'crazyradio': 64}
+    MAX_READ_RETRIES = 1000
+
+    def __init__(self, name: Optional[str] = None,
+                 ranges: Dict[MessageSource, int] = None) -> None:
+        """Create the shared memory of a new table, or attach to the table of
+        another process.
+
+          @param name: the name of the shared memory of an existing table,
+          None to create a new one.
+          @param ranges: the number of slots of every owner, in the same order
+          in every process.
+        """
+        self.ranges = ranges if ranges is not None else DroneTable.RANGES
+        self.owners: List[MessageSource] = list(self.ranges)
+        self.starts: Dict[MessageSource, int] = {}
+        start = 0
+        for owner, size in self.ranges.items():
+            self.starts[owner] = start
+            start += size
+        self.nSlots = start
+        self.slotsOffset = VERSION_STRUCT.size * len(self.owners)
+        size = self.slotsOffset + SLOT_SIZE * self.nSlots
+        if name is None:
+            self.memory = SharedMemory(create=True, size=size)
+            self.memory.buf[:size] = bytes(size)
+        else:
+            self.memory = SharedMemory(name=name)
+        self.name = self.memory.name
+        self.buffer = self.memory.buf
+        self.slots: Dict[str, int] = {}
+        self.lock = Lock()
+
+    def writeDrone(self, owner: MessageSource, drone: Drone) -> None:
+        """Write the state of a drone in the range of its owner. Missing
+        attributes are written as zeros, and numbers are converted to the
+        types of the table, so float ranges are truncated. A drone that cannot
+        be converted is logged and not written. Must only be called by the
+        process of the owner.
+
+          @param owner: the controller owning the drone.
+          @param drone: the state of the drone.
+        """
+        state = drone.get('state')
+        try:
+            position = [float(x) for x in drone.get('position', ())][:3]
+            ranges = [int(x) for x in drone.get('ranges', ())][:4]
+            payload = DRONE_STRUCT.pack(
+                True,
+                drone['name'].encode('utf-8'),
+                int(drone.get('timestamp', 0)),
+                float(drone.get('speed', 0.0)),
+                float(drone.get('battery', 0.0)),
+                *position, *[0.0] * (3 - len(position)),
+                float(drone.get('yaw', 0.0)),
+                *ranges, *[0] * (4 - len(ranges)),
+                DRONE_STATES.index(state) if state in DRONE_STATES else 0,
+                bool(drone.get('ledOn', False)),
+                bool(drone.get('real', False))
+            )
+        except (struct.error, TypeError, ValueError) as e:
+            logging.error(f'Could not write {drone["name"]} in the drone '
+                          f'table: {e}')
+            return
+        with self.lock:
+            slot = self.slots.get(drone['name'])
+            if slot is None:
+                slot = self.findFreeSlot(owner)
+                if slot is None:
+                    logging.error(
+                        f'No free slot in the drone table for {drone["name"]}'
+                        f', the {owner} range is full')
+                    return
+                self.slots[drone['name']] = slot
+            self.writeSlot(owner, slot, payload)
+
+    def removeDrone(self, owner: MessageSource, name: str) -> None:
+        """Free the slot of a drone. Must only be called by the process of the
+        owner.
+
+          @param owner: the controller owning the drone.
+          @param name: the name of the drone.
+        """
+        with self.lock:
+            slot = self.slots.pop(name, None)
+            if slot is not None:
+                self.writeSlot(owner, slot, EMPTY_SLOT)
+
+    def findFreeSlot(self, owner: MessageSource) -> Optional[int]:
+        """Returns the first slot of the range of the owner that no drone
+        uses, or None if the range is full. Must be called with the lock held.
+
+          @param owner: the controller owning the range.
+        """
+        usedSlots = set(self.slots.values())
+        start = self.starts[owner]
+        for slot in range(start, start + self.ranges[owner]):
+            if slot not in usedSlots:
+                return slot
+        return None
+
+    def writeSlot(self, owner: MessageSource, slot: int,
+                  payload: bytes) -> None:
+        """Write a slot under its sequence lock, then count the change in the
+        version of the range. Must be called with the lock held.
+
+          @param owner: the controller owning the range of the slot.
+          @param slot: the index of the slot.
+          @param payload: the packed drone.
+        """
+        offset = self.slotsOffset + slot * SLOT_SIZE
+        seq, = SEQ_STRUCT.unpack_from(self.buffer, offset)
+        SEQ_STRUCT.pack_into(self.buffer, offset, seq + 1)
+        self.buffer[offset + SEQ_STRUCT.size:offset + SLOT_SIZE] = payload
+        SEQ_STRUCT.pack_into(self.buffer, offset, seq + 2)
+        versionOffset = self.owners.index(owner) * VERSION_STRUCT.size
+        version, = VERSION_STRUCT.unpack_from(self.buffer, versionOffset)
+        VERSION_STRUCT.pack_into(self.buffer, versionOffset, version + 1)
+
+    def getVersion(self) -> int:
+        """Returns the number of changes of the table, in every range.
+
+        """
+        return sum(VERSION_STRUCT.unpack_from(
+            self.buffer, index * VERSION_STRUCT.size)[0]
+            for index in range(len(self.owners)))
+
+    def readSlot(self, slot: int) -> Optional[tuple]:
+        """Returns the unpacked drone of a slot, read consistently, or None
+        if the slot is not used or keeps changing while it is read.
+
+          @param slot: the index of the slot.
+        """
+        offset = self.slotsOffset + slot * SLOT_SIZE
+        for _ in range(DroneTable.MAX_READ_RETRIES):
+            seq, = SEQ_STRUCT.unpack_from(self.buffer, offset)
+            if seq % 2:
+                continue
+            values = DRONE_STRUCT.unpack_from(
+                self.buffer, offset + SEQ_STRUCT.size)
+            if SEQ_STRUCT.unpack_from(self.buffer, offset)[0] == seq:
+                return values if values[0] else None
+        logging.warning(f'Slot {slot} of the drone table kept changing')
+        return None
+
+    def readDrones(self) -> List[Tuple[MessageSource, Drone]]:
+        """Returns every frozen drone of the table with its owner. Each drone
+        is read consistently, but the drones may come from different moments.
+
+        """
+        drones = []
+        for owner in self.owners:
+            start = self.starts[owner]
+            for slot in range(start, start + self.ranges[owner]):
+                values = self.readSlot(slot)
+                if values is None:
+                    continue
+                (_, name, timestamp, speed, battery, x, y, z, yaw, front,
+                 left, back, right, state, ledOn, real) = values
+                drones.append((owner, FrozenDrone(Drone(
+                    name=name.rstrip(b'\0').decode('utf-8'),
+                    timestamp=timestamp,
+                    speed=speed,
+                    battery=battery,
+                    position=[x, y, z],
+                    yaw=yaw,
+                    ranges=[front, left, back, right],
+                    state=DRONE_STATES[state],
+                    ledOn=ledOn,
+                    real=real
+                ))))  # noqa
+        return drones
+
+    def close(self) -> None:
+        """Detach this process from the shared memory.
+
+        """
+        self.buffer = None
+        self.memory.close()
+
+    def unlink(self) -> None:
+        """Free the shared memory, once every process detached from it.
+
+        """
+        self.memory.unlink()
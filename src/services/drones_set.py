@@ -2,10 +2,12 @@
 robot-handler.py
 Static class to manage robots and their states
 """
-from copy import copy, deepcopy
-from typing import Any, Dict, TypedDict, Union
+from threading import Lock
+from types import MappingProxyType
+from typing import Any, Mapping, Optional, TypedDict, Union
 
-from src.models.drone import Drone
+from src.models.drone import Drone, FrozenDrone
+from src.services.fleet_view import FleetView
 
 
 class DroneSearchReturn(TypedDict):
@@ -13,24 +15,45 @@ class DroneSearchReturn(TypedDict):
     drone: Drone
 
 
+class DronesSnapshot(TypedDict):
+    version: int
+    drones: Mapping[Any, FrozenDrone]
+
+
 class DronesSet:
+    """Drones identified by a key. The set is copy on write: every change
+    builds a new read only snapshot of the drones with a new version, and
+    readers share the last snapshot without copying or locking it.
+    """
 
-    def __init__(self) -> None:
-        drones: Dict[Any, Drone] = {}
-        self.__drones = drones
+    def __init__(self, fleetView: Optional[FleetView] = None) -> None:
+        """Initialize an empty set.
+
+          @param fleetView: the fleet view to keep up to date with the drones
+          of the set, if any.
+        """
+        self.__snapshot = DronesSnapshot(version=0,
+                                         drones=MappingProxyType({}))
+        self.fleetView = fleetView
+        self.lock = Lock()
 
-    def getDrones(self) -> dict:
-        """Return a deep copy of the drones.
+    def getSnapshot(self) -> DronesSnapshot:
+        """Return the drones with their version, witch increases at every
+        change. The snapshot never changes.
         """
-        return copy(self.__drones)
+        return self.__snapshot
 
-    def getDrone(self, key: Any) -> Union[None, Drone]:
-        """Return the drone identified by the given key.
+    def getDrones(self) -> Mapping[Any, FrozenDrone]:
+        """Return a read only mapping of the drones, unaffected by later
+        changes of the set.
+        """
+        return self.__snapshot['drones']
+
+    def getDrone(self, key: Any) -> Union[None, FrozenDrone]:
+        """Return the read only drone identified by the given key.
           @param key: the key witch identifies the drone.
         """
-        if key in self.__drones:
-            return deepcopy(self.__drones[key])
-        return None
+        return self.__snapshot['drones'].get(key)
 
     def findDroneByName(self, name: str) -> Union[None, DroneSearchReturn]:
         """Search the saved drone with the given name. Return None if it
@@ -40,22 +63,41 @@ class DronesSet:
         """
         key: Any
         drone: Drone
-        for key, drone in self.__drones.items():
+        for key, drone in self.__snapshot['drones'].items():
             if drone['name'] == name:
                 return DroneSearchReturn(key=key, drone=drone)
         return None
 
-    def setDrone(self, key: Any, drone: Drone) -> None:
-        """Add the given drone to the saved drones.
+    def setDrone(self, key: Any, drone: Drone) -> FrozenDrone:
+        """Replace the saved drone with a frozen copy of the given drone, and
+        return that copy. A drone that is already frozen is saved as is.
 
         @param key: the key witch identifies the drone.
         @param drone: the drone data to save.
         """
-        self.__drones[key] = drone
+        if not isinstance(drone, FrozenDrone):
+            drone = FrozenDrone(drone)
+        with self.lock:
+            snapshot = self.__snapshot
+            self.__snapshot = DronesSnapshot(
+                version=snapshot['version'] + 1,
+                drones=MappingProxyType({**snapshot['drones'], key: drone}))
+            if self.fleetView is not None:
+                self.fleetView.updateDrone(drone)
+        return drone
 
     def removeDrone(self, key: Any) -> None:
         """Revome the drone associatede with the given key.
           @param key: the key that identifies the drone to remove.
         """
-        if key in self.__drones:
-            del self.__drones[key]
+        with self.lock:
+            snapshot = self.__snapshot
+            if key not in snapshot['drones']:
+                return
+            drones = dict(snapshot['drones'])
+            drone = drones.pop(key)
+            self.__snapshot = DronesSnapshot(
+                version=snapshot['version'] + 1,
+                drones=MappingProxyType(drones))
+            if self.fleetView is not None:
+                self.fleetView.removeDrone(drone['name'])
@@ -0,0 +1,117 @@
+from threading import Lock
+from typing import Dict, Optional, Tuple, TypedDict
+
+from src.metaclasses.singleton import Singleton
+from src.models.drone import Drone
+from src.models.message import MessageSource
+from src.services.drone_table import DroneTable
+
+
+class FleetSnapshot(TypedDict):
+    version: int
+    drones: Tuple[Drone, ...]
+
+
+class FleetView(metaclass=Singleton):
+    """Drones of every controller, kept up to date by their drones sets. The
+    version increases at every change, and the snapshot of a version is built
+    once and shared by every reader. The drones of a snapshot must not be
+    modified. When the controllers run in their own processes, the fleet is
+    shared through a drone table.
+    """
+
+    def __init__(self) -> None:
+        self.drones: Dict[str, Drone] = {}
+        self.version = 0
+        self.snapshot: Optional[FleetSnapshot] = FleetSnapshot(
+            version=0, drones=())
+        self.lock = Lock()
+        self.table: Optional[DroneTable] = None
+        self.owner: Optional[MessageSource] = None
+        self.owners: Dict[str, MessageSource] = {}
+
+    def attachTable(self, table: DroneTable,
+                    owner: Optional[MessageSource]) -> None:
+        """Share the fleet with the other processes through a drone table.
+        The process of a controller writes its drones to its range of the
+        table, and the process without a controller reads every range.
+
+          @param table: the drone table shared by the processes.
+          @param owner: the controller of this process, None to read the
+          drones of every controller.
+        """
+        with self.lock:
+            self.table = table
+            self.owner = owner
+            self.snapshot = None
+
+    def updateDrone(self, drone: Drone) -> None:
+        """Replace the state of a drone. The drone must not be modified
+        afterwards.
+
+          @param drone: the new state of the drone.
+        """
+        with self.lock:
+            self.drones[drone['name']] = drone
+            self.version += 1
+            self.snapshot = None
+            if self.table is not None and self.owner is not None:
+                self.table.writeDrone(self.owner, drone)
+
+    def removeDrone(self, name: str) -> None:
+        """Remove a drone from the fleet.
+
+          @param name: the name of the drone.
+        """
+        with self.lock:
+            if self.drones.pop(name, None) is not None:
+                self.version += 1
+                self.snapshot = None
+                if self.table is not None and self.owner is not None:
+                    self.table.removeDrone(self.owner, name)
+
+    def getSnapshot(self) -> FleetSnapshot:
+        """Returns the drones of the fleet and their version. The snapshot is
+        only built again after a change.
+
+        """
+        if self.table is not None and self.owner is None:
+            return self.getTableSnapshot()
+        snapshot = self.snapshot
+        if snapshot is not None:
+            return snapshot
+        with self.lock:
+            if self.snapshot is None:
+                self.snapshot = FleetSnapshot(
+                    version=self.version, drones=tuple(self.drones.values()))
+            return self.snapshot
+
+    def getTableSnapshot(self) -> FleetSnapshot:
+        """Returns the drones of every range of the drone table. The version
+        is the number of changes of the table, and the drones are only read
+        again after a change.
+
+        """
+        version = self.table.getVersion()
+        snapshot = self.snapshot
+        if snapshot is not None and snapshot['version'] == version:
+            return snapshot
+        with self.lock:
+            if self.snapshot is None or self.snapshot['version'] != version:
+                drones = self.table.readDrones()
+                self.owners = {drone['name']: owner for owner, drone in drones}
+                self.snapshot = FleetSnapshot(
+                    version=version,
+                    drones=tuple(drone for _, drone in drones))
+            return self.snapshot
+
+    def getOwner(self, name: str) -> Optional[MessageSource]:
+        """Returns the controller owning a drone according to the drone table,
+        or None if the drone is not in the table.
+
+          @param name: the name of the drone.
+        """
+        if self.table is None or self.owner is not None:
+            return None
+        self.getTableSnapshot()
+        return self.owners.get(name)
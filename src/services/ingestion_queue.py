@@ -0,0 +1,125 @@
+import itertools
+import logging
+from collections import OrderedDict, deque
+from threading import Condition, Thread
+from typing import Any, Callable, Deque, Dict, Hashable, Optional, Set, \
+    Tuple, TypedDict
+
+
+class IngestionStats(TypedDict):
+    depth: int
+    processed: int
+    coalesced: int
+    dropped: int
+
+
+class IngestionQueue:
+    """Bounded queues of events, one per drone, drained by worker threads.
+    The events of a drone are processed in order and by one worker at a
+    time. An event with a coalesce key replaces the pending event with the
+    same key, so only the latest telemetry of each kind is processed.
+    """
+    MAX_DEPTH = 32
+    N_WORKERS = 2
+
+    def __init__(self, maxDepth: int = MAX_DEPTH,
+                 nWorkers: int = N_WORKERS) -> None:
+        """Initialize the queues and start the workers.
+
+          @param maxDepth: the maximum number of pending events per drone.
+          @param nWorkers: the number of worker threads.
+        """
+        self.maxDepth = maxDepth
+        self.condition = Condition()
+        self.queues: Dict[Any, 'OrderedDict[Hashable, Tuple]'] = {}
+        self.stats: Dict[Any, IngestionStats] = {}
+        self.readyKeys: Deque[Any] = deque()
+        self.scheduledKeys: Set[Any] = set()
+        self.sequence = itertools.count()
+        self.running = True
+        self.workers = [Thread(target=self.work, daemon=True)
+                        for _ in range(nWorkers)]
+        for worker in self.workers:
+            worker.start()
+
+    def put(self, key: Any, callback: Callable, args: Tuple = (),
+            coalesceKey: Optional[Hashable] = None) -> bool:
+        """Add an event to the queue of a drone. Never blocks: returns False
+        if the queue is full and the event is dropped. Events without a
+        coalesce key, like connections, are never dropped.
+
+          @param key: the key of the drone.
+          @param callback: the function processing the event.
+          @param args: the arguments of the callback.
+          @param coalesceKey: the key of the events replacing each other,
+          None for an event that is never replaced.
+        """
+        with self.condition:
+            queue = self.queues.setdefault(key, OrderedDict())
+            stats = self.stats.setdefault(key, IngestionStats(
+                depth=0, processed=0, coalesced=0, dropped=0))
+            if coalesceKey is not None and coalesceKey in queue:
+                queue[coalesceKey] = (callback, args)
+                queue.move_to_end(coalesceKey)
+                stats['coalesced'] += 1
+                return True
+            if coalesceKey is not None and len(queue) >= self.maxDepth:
+                stats['dropped'] += 1
+                return False
+            if coalesceKey is None:
+                coalesceKey = ('event', next(self.sequence))
+            queue[coalesceKey] = (callback, args)
+            stats['depth'] = len(queue)
+            if key not in self.scheduledKeys:
+                self.scheduledKeys.add(key)
+                self.readyKeys.append(key)
+                self.condition.notify()
+        return True
+
+    def work(self) -> None:
+        """Take the pending events of one drone at a time and process them,
+        until the queue is stopped.
+
+        """
+        while True:
+            with self.condition:
+                while self.running and not self.readyKeys:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                key = self.readyKeys.popleft()
+                queue = self.queues[key]
+                events = list(queue.values())
+                queue.clear()
+                self.stats[key]['depth'] = 0
+
+            for callback, args in events:
+                try:
+                    callback(*args)
+                except Exception as e:  # noqa
+                    logging.error(
+                        f'Error while processing event of {key}: {e}')
+
+            with self.condition:
+                self.stats[key]['processed'] += len(events)
+                if self.queues[key]:
+                    self.readyKeys.append(key)
+                    self.condition.notify()
+                else:
+                    self.scheduledKeys.discard(key)
+
+    def getStats(self) -> Dict[Any, IngestionStats]:
+        """Returns a copy of the counters of every drone queue.
+
+        """
+        with self.condition:
+            return {key: IngestionStats(**stats)
+                    for key, stats in self.stats.items()}
+
+    def stop(self) -> None:
+        """Stop the workers. Pending events are not processed.
+
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
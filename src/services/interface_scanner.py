@@ -0,0 +1,112 @@
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from threading import Event, Lock
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+
+class InterfaceScanner:
+    """Probe drone addresses concurrently. Addresses seen recently are probed
+    first and addresses that never answer are probed less and less often.
+    """
+    BASE_BACKOFF = 5
+    MAX_BACKOFF = 120
+    MAX_WORKERS = 8
+
+    def __init__(self, addresses: Iterable[int],
+                 probe: Callable[[int], List],
+                 maxWorkers: int = MAX_WORKERS) -> None:
+        """Initialize the scanner.
+
+          @param addresses: the addresses of the drones to look for.
+          @param probe: the function returning the interfaces found at an
+          address.
+          @param maxWorkers: the maximum number of concurrent probes.
+        """
+        self.addresses = list(addresses)
+        self.probe = probe
+        self.executor = ThreadPoolExecutor(max_workers=maxWorkers)
+        self.lastSeen: Dict[int, float] = {}
+        self.failures: Dict[int, int] = {}
+        self.nextProbe: Dict[int, float] = {}
+        self.lock = Lock()
+        self.rescanEvent = Event()
+
+    def scan(self, skip: Iterable[int] = ()) -> Iterator[List]:
+        """Probe every address that is due, except the skipped ones, and
+        yield the interfaces as soon as each probe answers.
+
+          @param skip: the addresses not to probe, like connected drones.
+        """
+        now = time.monotonic()
+        skipped = set(skip)
+        with self.lock:
+            due = [address for address in self.addresses
+                   if address not in skipped and
+                   self.nextProbe.get(address, 0) <= now]
+            due.sort(key=lambda a: self.lastSeen.get(a, -math.inf),
+                     reverse=True)
+        futures = {self.executor.submit(self.probe, address): address
+                   for address in due}
+        for future in as_completed(futures):
+            address = futures[future]
+            try:
+                interfaces = future.result()
+            except Exception as e:
+                logging.debug(f'Scan of address {address:X} failed: {e}')
+                interfaces = []
+            self.recordProbe(address, len(interfaces) != 0)
+            for interface in interfaces:
+                yield interface
+
+    def recordProbe(self, address: int, found: bool) -> None:
+        """Update the probing schedule of an address.
+
+          @param address: the probed address.
+          @param found: whether a drone answered at this address.
+        """
+        now = time.monotonic()
+        with self.lock:
+            if found:
+                self.lastSeen[address] = now
+                self.failures[address] = 0
+                self.nextProbe[address] = now
+                return
+            failures = self.failures.get(address, 0) + 1
+            self.failures[address] = failures
+            self.nextProbe[address] = now + min(
+                InterfaceScanner.MAX_BACKOFF,
+                InterfaceScanner.BASE_BACKOFF * 2 ** (failures - 1))
+
+    def requestRescan(self, address: Optional[int] = None) -> None:
+        """Clear the backoff of the address, or of every address, and wake
+        up the thread waiting for the next scan.
+
+          @param address: the address to probe again, None for all of them.
+        """
+        with self.lock:
+            if address is None:
+                self.nextProbe.clear()
+                self.failures.clear()
+            else:
+                self.nextProbe.pop(address, None)
+                self.failures.pop(address, None)
+        self.rescanEvent.set()
+
+    def waitForRescan(self, timeout: float) -> bool:
+        """Wait until the timeout expires or a rescan is requested. Returns
+        True if a rescan was requested.
+
+          @param timeout: the maximum waiting time in seconds.
+        """
+        requested = self.rescanEvent.wait(timeout)
+        self.rescanEvent.clear()
+        return requested
+
+    def shutdown(self) -> None:
+        """Stop the probing threads and wake up the waiting thread.
+
+        """
+        self.rescanEvent.set()
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,217 @@
+import logging
+import time
+from collections import deque
+from threading import Condition, Lock, Thread, current_thread
+from typing import (Callable, Deque, Dict, List, Optional, Tuple,
+                    TypedDict)
+
+
+class BusStats(TypedDict):
+    depth: int
+    dispatched: int
+    merged: int
+    dropped: int
+    averageLatency: float
+    maxLatency: float
+
+
+class Inbox:
+    """Bounded queue of the messages published to a subscriber, dispatched
+    in order by a dedicated thread. When it is full, a mergeable message is
+    merged with the pending mergeable messages, and the publisher of any
+    other message waits for room. A message still without room after
+    PUT_TIMEOUT is dropped, so that publishers never wait on each other
+    forever.
+    """
+    PUT_TIMEOUT = 1.0
+
+    def __init__(self, name: str, handler: Callable, maxDepth: int,
+                 merge: Optional[Callable[[Tuple, Tuple],
+                                          Optional[Tuple]]] = None) -> None:
+        """Initialize the inbox and start its thread.
+
+          @param name: the name of the subscriber, for the logs.
+          @param handler: the function called with the published arguments.
+          @param maxDepth: the number of messages the inbox holds.
+          @param merge: the function merging the arguments of two mergeable
+          messages, in the order they were published, or returning None if
+          they cannot be merged. Without it, mergeable messages wait for
+          room like the others.
+        """
+        self.name = name
+        self.handler = handler
+        self.maxDepth = maxDepth
+        self.merge = merge
+        self.entries: Deque[list] = deque()
+        lock = Lock()
+        self.condition = Condition(lock)
+        self.room = Condition(lock)
+        self.running = True
+        self.stats = BusStats(depth=0, dispatched=0, merged=0, dropped=0,
+                              averageLatency=0.0, maxLatency=0.0)
+        self.totalLatency = 0.0
+        self.thread = Thread(target=self.work, name=f'bus-{name}',
+                             daemon=True)
+        self.thread.start()
+
+    def put(self, args: Tuple, mergeable: bool) -> bool:
+        """Add a message to the inbox. Waits at most PUT_TIMEOUT for room,
+        and never when called by the dispatcher thread of the inbox itself.
+        Returns False if the message is dropped.
+
+          @param args: the arguments of the handler.
+          @param mergeable: whether the message may be merged with the
+          pending mergeable messages when the inbox is full.
+        """
+        with self.condition:
+            if len(self.entries) >= self.maxDepth and \
+                    self.merge is not None:
+                if mergeable and self.mergeLast(args):
+                    return True
+                self.compact()
+            if len(self.entries) >= self.maxDepth and \
+                    current_thread() is not self.thread:
+                self.room.wait_for(
+                    lambda: len(self.entries) < self.maxDepth or
+                    not self.running, Inbox.PUT_TIMEOUT)
+                if len(self.entries) >= self.maxDepth:
+                    self.stats['dropped'] += 1
+                    logging.error(f'The inbox of {self.name} stayed full, '
+                                  f'{args[0].get("type")} dropped')
+                    return False
+            self.entries.append([time.monotonic(), args, mergeable])
+            self.condition.notify()
+        return True
+
+    def mergeLast(self, args: Tuple) -> bool:
+        """Merge a mergeable message with the last pending message, if it is
+        mergeable too. Returns False if they cannot be merged. Must be called
+        with the condition held.
+
+          @param args: the arguments of the new message.
+        """
+        if not self.entries or not self.entries[-1][2]:
+            return False
+        merged = self.merge(self.entries[-1][1], args)
+        if merged is None:
+            return False
+        self.entries[-1][1] = merged
+        self.stats['merged'] += 1
+        return True
+
+    def compact(self) -> bool:
+        """Merge the newest pair of consecutive mergeable messages, so that
+        the messages keep their order. Returns False if there is none. Must
+        be called with the condition held.
+
+        """
+        for index in range(len(self.entries) - 1, 0, -1):
+            previous, entry = self.entries[index - 1], self.entries[index]
+            if not previous[2] or not entry[2]:
+                continue
+            merged = self.merge(previous[1], entry[1])
+            if merged is not None:
+                previous[1] = merged
+                del self.entries[index]
+                self.stats['merged'] += 1
+                return True
+        return False
+
+    def work(self) -> None:
+        """Dispatch the messages to the handler until the inbox stops.
+
+        """
+        while True:
+            with self.condition:
+                while self.running and not self.entries:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                enqueuedAt, args, _ = self.entries.popleft()
+                self.room.notify()
+                latency = time.monotonic() - enqueuedAt
+                self.stats['dispatched'] += 1
+                self.totalLatency += latency
+                self.stats['maxLatency'] = max(self.stats['maxLatency'],
+                                               latency)
+            try:
+                self.handler(*args)
+            except Exception as e:  # noqa
+                logging.error(f'Error while dispatching to {self.name}: {e}')
+
+    def getStats(self) -> BusStats:
+        """Returns a copy of the counters of the inbox. The latency is the
+        time spent by the messages in the inbox, in seconds.
+
+        """
+        with self.condition:
+            stats = BusStats(**self.stats)
+            stats['depth'] = len(self.entries)
+            if stats['dispatched']:
+                stats['averageLatency'] = \
+                    self.totalLatency / stats['dispatched']
+            return stats
+
+    def stop(self) -> None:
+        """Stop the thread. Pending messages are not dispatched.
+
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+            self.room.notify_all()
+
+
+class MessageBus:
+    """In process publish/subscribe bus. Every subscriber has its own inbox
+    and thread, so a publisher never runs the code of a subscriber.
+    """
+    MAX_DEPTH = 1024
+
+    def __init__(self) -> None:
+        self.subscribers: Dict[str, List[Inbox]] = {}
+        self.inboxes: Dict[str, Inbox] = {}
+
+    def subscribe(self, topic: str, name: str, handler: Callable,
+                  maxDepth: int = MAX_DEPTH,
+                  merge: Optional[Callable[[Tuple, Tuple],
+                                           Optional[Tuple]]] = None) -> None:
+        """Call the handler, on the thread of the subscriber, with the
+        arguments of every message published on the topic.
+
+          @param topic: the topic to subscribe to.
+          @param name: the name of the subscriber, unique on the bus.
+          @param handler: the function called with the published arguments.
+          @param maxDepth: the size of the inbox of the subscriber.
+          @param merge: the function merging two mergeable messages of the
+          subscriber, if any.
+        """
+        inbox = Inbox(name, handler, maxDepth, merge)
+        self.inboxes[name] = inbox
+        self.subscribers.setdefault(topic, []).append(inbox)
+
+    def publish(self, topic: str, *args, mergeable: bool = False) -> None:
+        """Queue a message for every subscriber of the topic. Waits while the
+        inbox of a subscriber is full, at most Inbox.PUT_TIMEOUT.
+
+          @param topic: the topic of the message.
+          @param args: the arguments of the handlers.
+          @param mergeable: whether the message may be merged with the
+          pending messages of a subscriber lagging behind.
+        """
+        for inbox in self.subscribers.get(topic, ()):
+            inbox.put(args, mergeable)
+
+    def getStats(self) -> Dict[str, BusStats]:
+        """Returns the counters of the inbox of every subscriber.
+
+        """
+        return {name: inbox.getStats()
+                for name, inbox in self.inboxes.items()}
+
+    def stop(self) -> None:
+        """Stop the threads of every subscriber.
+
+        """
+        for inbox in self.inboxes.values():
+            inbox.stop()
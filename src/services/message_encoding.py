@@ -0,0 +1,73 @@
+import json
+from typing import Dict, Optional
+
+import cbor2
+import msgpack
+from src.models.message import Message, MessageEncoding
+from src.services.outbound_queue import Frame
+
+ENCODINGS = ('json', 'msgpack', 'cbor')
+
+
+def parseEncoding(encoding: Optional[str]) -> Optional[MessageEncoding]:
+    """Returns the encoding if it is supported, None otherwise.
+
+      @param encoding: the name of the encoding requested by a dashboard.
+    """
+    return encoding if encoding in ENCODINGS else None
+
+
+def encodeMessage(message: Message, encoding: MessageEncoding) -> Frame:
+    """Encode a message as a json text frame, or as a binary frame.
+
+      @param message: the message to encode.
+      @param encoding: the encoding of the frame.
+    """
+    if encoding == 'msgpack':
+        return msgpack.packb(message)
+    if encoding == 'cbor':
+        return cbor2.dumps(message)
+    return json.dumps(message)
+
+
+def decodeMessage(frame: Frame, encoding: MessageEncoding) -> Message:
+    """Decode a frame received from a dashboard. Text frames are always
+    json, binary frames use the encoding of the dashboard. Raises ValueError
+    if the frame is malformed or is not a message, whatever its encoding.
+
+      @param frame: the received frame.
+      @param encoding: the encoding of the dashboard.
+    """
+    try:
+        if isinstance(frame, str) or encoding == 'json':
+            message = json.loads(frame)
+        elif encoding == 'msgpack':
+            message = msgpack.unpackb(frame)
+        else:
+            message = cbor2.loads(frame)
+    except (cbor2.CBORDecodeError, msgpack.UnpackException, TypeError) as e:
+        raise ValueError(f'Malformed {encoding} frame: {e}') from e
+    if not isinstance(message, dict) or 'type' not in message:
+        raise ValueError(f'The frame is not a message: {message}')
+    return message
+
+
+class EncodedFrames:
+    """Frames of a message, encoded once per encoding and shared by every
+    dashboard using that encoding.
+    """
+
+    def __init__(self, message: Message) -> None:
+        self.message = message
+        self.frames: Dict[MessageEncoding, Frame] = {}
+
+    def get(self, encoding: MessageEncoding) -> Frame:
+        """Returns the frame of the message in the encoding.
+
+          @param encoding: the encoding of the frame.
+        """
+        frame = self.frames.get(encoding)
+        if frame is None:
+            frame = encodeMessage(self.message, encoding)
+            self.frames[encoding] = frame
+        return frame
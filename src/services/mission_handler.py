@@ -1,6 +1,6 @@
 import logging
 import math
-from typing import Callable, List, Tuple
+from typing import Callable, List, Tuple, TypedDict
 
 import kdtree
 from src.models.drone import Drone
@@ -13,6 +13,12 @@ from src.utils.css_predifined_colors import CSS_PREDEFINED_COLORS
 from src.utils.timestamp import getTimestamp
 
 
+class PositionAndRange(TypedDict):
+    droneName: str
+    position: Vec2
+    yaw: float
+    ranges: List[int]
+
 
 class MissionHandler:
     MAX_DISTANCE = 0.21
@@ -72,8 +78,48 @@ class MissionHandler:
         self.kdtree = kdtree.create(dimensions=2)
 
     def onReceivedPositionAndRange(self, droneName: str, position: Vec2, yaw: float, ranges: List[int]):
+        """Calculate the point indicated by the given ranges and orientation,
+        then send the update of the mission to the dashboards.
+
+          @param droneName: the name of the drone witch sent the informations.
+          @param position: the 2D position of the drone.
+          @param yaw: the angle of the drone in radiant.
+          @param ranges: the list of ranges (front, left, back, right)
+        """
+        self.onReceivedPositionsAndRanges([PositionAndRange(
+            droneName=droneName, position=position, yaw=yaw, ranges=ranges)])
+
+    def onReceivedPositionsAndRanges(self, updates: List[PositionAndRange]):
+        """Calculate the points indicated by the ranges and orientations of
+        several drones, then send all the updates of the mission to the
+        dashboards in a single mission pulse.
+
+          @param updates: the positions and ranges of the drones.
+        """
+        missionPulse = MissionPulse(id=self.mission['id'])
+        newMissionPoints: List[MissionPoint] = []
+        for update in updates:
+            xPos, yPos, points = self.computePositionAndPoints(
+                update['droneName'], update['position'], update['yaw'],
+                update['ranges'])
+            newMissionPoints.extend(self.handlePositionAndBorders(
+                missionPulse, update['droneName'], Vec2(x=xPos, y=yPos),
+                points))
+        if newMissionPoints:
+            missionPulse['points'] = newMissionPoints
+            self.mission['points'] = [*self.mission['points'],
+                                      *newMissionPoints]
+        # DatabaseService.saveMission(self.mission['id'], self.mission)
+        if len(missionPulse) > 1:
+            self.sendMessageCallable(
+                Message(type='missionPulse', data=missionPulse))
+
+    def computePositionAndPoints(self, droneName: str, position: Vec2,
+                                 yaw: float, ranges: List[int]
+                                 ) -> Tuple[float, float, List[Vec2]]:
         """Calculate the point indicated by the given ranges and orientation.
          Translate to coordinates from the received axis to the dashboard axis.
+         Returns the translated position and the new valid points.
 
           @param droneName: the name of the drone witch sent the informations.
           @param position: the 2D position of the drone.
@@ -114,8 +160,7 @@ class MissionHandler:
             if self.checkPointValidity((point['x'], point['y'])):
                 points.append(point)
             i += 1
-        self.handlePositionAndBorders(
-            droneName, Vec2(x=xPos, y=yPos), points)
+        return xPos, yPos, points
 
     def checkPointValidity(self, point: Tuple[float, float]) -> bool:
         """Check if the given point isn't too close to an already existing point.
@@ -132,29 +177,26 @@ class MissionHandler:
             self.kdtree.add(point)
             return True
 
-    def handlePositionAndBorders(self, droneName: str, position: Vec2, points: List[Vec2]):
-        """Add the new position of the drone as well as the position of the border it found to the mission.
-        Saves the updated mission to the database.
+    def handlePositionAndBorders(self, missionPulse: MissionPulse,
+                                 droneName: str, position: Vec2,
+                                 points: List[Vec2]) -> List[MissionPoint]:
+        """Add the new position of the drone to the mission and to the given
+        mission pulse. Returns the mission points of the borders it found.
+          @param missionPulse: the mission pulse to complete.
           @param droneName: the name of the drone witch sent the informations.
           @param position: the 2D position of the drone.
           @param points: a list of 2D points
         """
-        newMissionPoints = list(map(lambda point: MissionPoint(
-            droneName=droneName, value=point), points))
-        missionPulse = MissionPulse(id=self.mission['id'])
-        if newMissionPoints:
-            missionPulse['points'] = newMissionPoints
         lastPos = self.mission['dronesPositions'][droneName]
         if lastPos == [] or \
                 math.dist([lastPos['x'], lastPos['y']], [position['x'], position['y']]) > self.MIN_POINTS_DIST:
-            missionPulse['dronesPositions'] = {droneName: position}
+            if 'dronesPositions' not in missionPulse:
+                missionPulse['dronesPositions'] = {}
+            missionPulse['dronesPositions'][droneName] = position
             self.mission['dronesPositions'][droneName] = position
             self.mission['dronesPaths'][droneName].append(position)
-        self.mission['points'] = [*self.mission['points'], *newMissionPoints]
-        # DatabaseService.saveMission(self.mission['id'], self.mission)
-        if len(missionPulse) > 1:
-            self.sendMessageCallable(
-                Message(type='missionPulse', data=missionPulse))
+        return list(map(lambda point: MissionPoint(
+            droneName=droneName, value=point), points))
 
     def assignPointsToShapes(self):
         """Goes over all the point found during the mission and try to
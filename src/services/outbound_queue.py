@@ -0,0 +1,108 @@
+import time
+from collections import deque
+from threading import Condition
+from typing import Callable, Deque, Optional, Union
+
+Frame = Union[str, bytes]
+
+
+class OutboundQueue:
+    """Bounded queue of encoded frames waiting to be written to a dashboard.
+    When it is full, the oldest droppable frame is dropped. Frames that are
+    not droppable are always kept, and the queue reports itself as lagging
+    once its oldest frame waited longer than the lag limit. A consumer that
+    cannot block on get, like a coroutine, sets onReady to be told when the
+    queue stops being empty.
+    """
+    MAX_FRAMES = 256
+    LAG_LIMIT = 5
+
+    def __init__(self, maxFrames: int = MAX_FRAMES,
+                 lagLimit: float = LAG_LIMIT) -> None:
+        """Initialize an empty queue.
+
+          @param maxFrames: the number of frames above witch droppable frames
+          are dropped.
+          @param lagLimit: the maximum waiting time of a frame, in seconds.
+        """
+        self.maxFrames = maxFrames
+        self.lagLimit = lagLimit
+        self.frames: Deque[list] = deque()
+        self.condition = Condition()
+        self.closed = False
+        self.dropped = 0
+        self.onReady: Optional[Callable[[], None]] = None
+
+    def put(self, frame: Frame, droppable: bool) -> bool:
+        """Add a frame to the queue. Never blocks. Returns False if the
+        consumer lags behind the limit and should be disconnected.
+
+          @param frame: the encoded frame.
+          @param droppable: whether the frame may be dropped when the queue is
+          full.
+        """
+        now = time.monotonic()
+        with self.condition:
+            if self.closed:
+                return True
+            if self.frames and now - self.frames[0][1] > self.lagLimit:
+                return False
+            if len(self.frames) >= self.maxFrames and \
+                    not self.dropOldest() and droppable:
+                self.dropped += 1
+                return True
+            wasEmpty = not self.frames
+            self.frames.append([frame, now, droppable])
+            self.condition.notify()
+        if wasEmpty and self.onReady is not None:
+            self.onReady()
+        return True
+
+    def dropOldest(self) -> bool:
+        """Drop the oldest droppable frame. Returns False if there is none.
+        Must be called with the condition held.
+
+        """
+        for entry in self.frames:
+            if entry[2]:
+                self.frames.remove(entry)
+                self.dropped += 1
+                return True
+        return False
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Frame]:
+        """Wait for the next frame and remove it from the queue. Returns None
+        if the queue is closed or the timeout expired.
+
+          @param timeout: the maximum waiting time in seconds, or None.
+        """
+        with self.condition:
+            if not self.frames and not self.closed:
+                self.condition.wait(timeout)
+            if self.closed or not self.frames:
+                return None
+            return self.frames.popleft()[0]
+
+    def wakeup(self) -> None:
+        """Wake up the consumer waiting for a frame, so that it can check its
+        other duties.
+
+        """
+        with self.condition:
+            self.condition.notify_all()
+        if self.onReady is not None:
+            self.onReady()
+
+    def close(self) -> None:
+        """Close the queue and wake up its consumer.
+
+        """
+        with self.condition:
+            self.closed = True
+            self.frames.clear()
+            self.condition.notify_all()
+        if self.onReady is not None:
+            self.onReady()
+
+    def __len__(self) -> int:
+        return len(self.frames)
@@ -1,12 +1,15 @@
 import logging
 import os
 import pathlib
-from typing import List, Optional
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
 
 import cflib.bootloader
 import cflib.crtp
 import docker
-from src.models.software_update import ProjectType
+from src.models.software_update import FlashProgress, ProjectType
 from src.utils.setup_logging import SUCCESS_LEVEL_NUM
 
 
@@ -30,6 +33,9 @@ class ProjectLoader:
         # },
     }
 
+    MAX_FLASH_ATTEMPTS = 3
+    RETRY_DELAY = 1
+
     containerImage = 'firmware_image'
     containerName = 'firmware_cload'
     lastProjectType: Optional[ProjectType] = None
@@ -124,27 +130,129 @@ class ProjectLoader:
 
         return True
 
-    def flash(self, clinks: List[str]):
-        """Try to flash the drone with the compilated code.
+    def flash(self, clinks: List[str], maxConcurrent: int = 1,
+              onProgress: Optional[Callable[[FlashProgress], None]] = None
+              ) -> List[str]:
+        """Try to flash the drones with the compilated code. Drones on
+        different dongles are flashed at the same time, drones sharing a
+        dongle one after the other. Returns the clinks successfully flashed.
 
-          @param clinks: the compilated code.
+          @param clinks: the uris of the drones to flash.
+          @param maxConcurrent: the maximum number of drones flashed at the
+          same time, usually the number of dongles.
+          @param onProgress: the function to call on every progress step.
         """
+        if onProgress is None:
+            def onProgress(progress: FlashProgress): pass
+
+        groups: Dict[str, List[str]] = defaultdict(list)
         for clink in clinks:
-            logging.info(f'Flashing {clink}...')
-            bl = cflib.bootloader.Bootloader(clink)
+            groups[ProjectLoader.getDongle(clink)].append(clink)
+            onProgress(FlashProgress(
+                name=clink, status='waiting', progress=0, attempt=0))
+
+        def flashGroup(group: List[str]) -> List[str]:
+            return [clink for clink in group
+                    if self.flashWithRetries(clink, onProgress)]
+
+        flashed: List[str] = []
+        nWorkers = max(1, min(maxConcurrent, len(groups)))
+        with ThreadPoolExecutor(max_workers=nWorkers) as executor:
+            for group in executor.map(flashGroup, groups.values()):
+                flashed.extend(group)
+        return flashed
+
+    @staticmethod
+    def getDongle(clink: str) -> str:
+        """Returns the dongle part of a radio uri.
+
+          @param clink: the uri of the drone.
+        """
+        return clink.split('://', 1)[-1].split('/', 1)[0]
+
+    @staticmethod
+    def keepBootloaderOnDongle(bl: cflib.bootloader.Bootloader,
+                               dongle: str) -> None:
+        """Move the bootloader link of a warm booted drone to the dongle of
+        the drone. cflib always reconnects to the bootloader on dongle 0, so
+        the drones of every dongle would share its radio.
+
+          @param bl: the bootloader of the drone.
+          @param dongle: the dongle part of the uri of the drone.
+        """
+        cload = bl._cload  # noqa
+        resetToBootloader = cload.reset_to_bootloader
+
+        def resetOnDongle(targetId: int) -> bool:
+            if not resetToBootloader(targetId):
+                return False
+            uri = cload.link.uri
+            if dongle != '0' and uri.startswith('radio://0/'):
+                cload.link.close()
+                cload.link = cflib.crtp.get_link_driver(
+                    f'radio://{dongle}/{uri[len("radio://0/"):]}')
+            return True
+
+        cload.reset_to_bootloader = resetOnDongle
+
+    def flashWithRetries(self, clink: str,
+                         onProgress: Callable[[FlashProgress], None]) -> bool:
+        """Flash a single drone, retrying it alone when it fails.
+
+          @param clink: the uri of the drone to flash.
+          @param onProgress: the function to call on every progress step.
+        """
+        for attempt in range(1, ProjectLoader.MAX_FLASH_ATTEMPTS + 1):
+            if self.flashOne(clink, attempt, onProgress):
+                onProgress(FlashProgress(
+                    name=clink, status='success', progress=100,
+                    attempt=attempt))
+                logging.log(SUCCESS_LEVEL_NUM, f'[{clink}] ...success')
+                return True
+            if attempt < ProjectLoader.MAX_FLASH_ATTEMPTS:
+                onProgress(FlashProgress(
+                    name=clink, status='retrying', progress=0,
+                    attempt=attempt))
+                time.sleep(ProjectLoader.RETRY_DELAY)
+        onProgress(FlashProgress(
+            name=clink, status='failed', progress=0,
+            attempt=ProjectLoader.MAX_FLASH_ATTEMPTS))
+        logging.error(f'[{clink}] ...flash failed')
+        return False
 
+    def flashOne(self, clink: str, attempt: int,
+                 onProgress: Callable[[FlashProgress], None]) -> bool:
+        """Warm boot a drone to its bootloader and flash it once. Returns
+        True if the drone was flashed.
+
+          @param clink: the uri of the drone to flash.
+          @param attempt: the number of the attempt.
+          @param onProgress: the function to call on every progress step.
+        """
+        logging.info(f'Flashing {clink}...')
+        bl = cflib.bootloader.Bootloader(clink)
+        ProjectLoader.keepBootloaderOnDongle(
+            bl, ProjectLoader.getDongle(clink))
+        bl.progress_cb = lambda message, percent: onProgress(FlashProgress(
+            name=clink, status='flashing', progress=int(percent),
+            attempt=attempt))
+
+        try:
             try:
                 ok = bl.start_bootloader(warm_boot=True)
             except AttributeError:
-                logging.error(f'...bad clink provided')
-                continue
+                logging.error(f'[{clink}] ...bad clink provided')
+                return False
 
             if not ok:
-                logging.error(f'...failed to warm boot')
-                continue
+                logging.error(f'[{clink}] ...failed to warm boot')
+                return False
 
             bl.flash(self.bin, ProjectLoader.targets)
             bl.reset_to_firmware()
-
+            return True
+        except Exception as e:  # noqa
+            logging.error(f'[{clink}] ...{e}')
+            return False
+        finally:
             bl.close()
-            logging.log(SUCCESS_LEVEL_NUM, f'...success')
@@ -0,0 +1,107 @@
+import time
+from threading import Lock
+from typing import Callable, Dict, List, Optional
+
+from src.models.message import Message
+from src.models.mission import MissionPulse
+
+
+class PulseThrottle:
+    """Merge the pulses and mission pulses sent to a dashboard during a
+    window, so that it receives at most one update per drone and per mission
+    at each tick. The merged updates carry the sequence number of the last
+    message merged.
+    """
+    THROTTLED_TYPES = {'pulse', 'pulses', 'missionPulse'}
+    MERGED_DICTS = {'dronesPositions', 'dronesPaths'}
+    MERGED_LISTS = {'points'}
+
+    def __init__(self, maxRate: float) -> None:
+        """Initialize an empty throttle.
+
+          @param maxRate: the maximum number of updates per second.
+        """
+        self.interval = 1 / maxRate
+        self.nextTick = time.monotonic() + self.interval
+        self.pendingDrones: Dict[str, dict] = {}
+        self.pendingMissions: Dict[Optional[str], MissionPulse] = {}
+        self.lastSeq: Optional[int] = None
+        self.lock = Lock()
+
+    def add(self, message: Message) -> bool:
+        """Merge the message with the pending updates. Returns False if the
+        message is not throttled and must be sent as is.
+
+          @param message: the message to merge.
+        """
+        messageType = message['type']
+        if messageType not in PulseThrottle.THROTTLED_TYPES:
+            return False
+        with self.lock:
+            self.lastSeq = message.get('seq', self.lastSeq)
+            if messageType == 'pulse':
+                self.mergeDrone(message['data'])
+            elif messageType == 'pulses':
+                for diff in message['data']:
+                    self.mergeDrone(diff)
+            else:
+                self.mergeMission(message['data'])
+        return True
+
+    def mergeDrone(self, diff: dict) -> None:
+        """Merge the changes of a drone with its pending changes. Must be
+        called with the lock held.
+
+          @param diff: the changed attributes of the drone.
+        """
+        pending = self.pendingDrones.get(diff['name'])
+        if pending is None:
+            self.pendingDrones[diff['name']] = dict(diff)
+        else:
+            pending.update(diff)
+
+    def mergeMission(self, missionPulse: MissionPulse) -> None:
+        """Merge a mission pulse with the pending pulse of its mission. New
+        points are appended, positions and paths are updated by drone and
+        the other attributes are replaced. Must be called with the lock held.
+
+          @param missionPulse: the mission pulse to merge.
+        """
+        pending = self.pendingMissions.setdefault(missionPulse.get('id'), {})
+        for key, value in missionPulse.items():
+            if key in PulseThrottle.MERGED_DICTS:
+                pending.setdefault(key, {}).update(value)
+            elif key in PulseThrottle.MERGED_LISTS:
+                pending.setdefault(key, []).extend(value)
+            else:
+                pending[key] = value
+
+    def timeUntilTick(self) -> float:
+        """Returns the time before the next tick in seconds, 0 if it is due.
+
+        """
+        return max(0.0, self.nextTick - time.monotonic())
+
+    def flush(self, send: Callable[[Message], None]) -> None:
+        """Send the merged updates and start a new window. The lock is held
+        while sending so that the merged updates keep their order with the
+        messages sent right after.
+
+          @param send: the function queueing a message for the dashboard.
+        """
+        with self.lock:
+            self.nextTick = time.monotonic() + self.interval
+            messages: List[Message] = []
+            if self.pendingDrones:
+                messages.append(Message(
+                    type='pulses', data=list(self.pendingDrones.values())))
+            for missionPulse in self.pendingMissions.values():
+                messages.append(Message(type='missionPulse',
+                                        data=missionPulse))
+            self.pendingDrones = {}
+            self.pendingMissions = {}
+            if self.lastSeq is not None:
+                for message in messages:
+                    message['seq'] = self.lastSeq
+            for message in messages:
+                send(message)
@@ -0,0 +1,229 @@
+import logging
+import struct
+from abc import ABC, abstractmethod
+from typing import Dict, List, Tuple
+
+import cflib.crtp
+from cflib.crtp import radiodriver
+from cflib.crtp.radiodriver import RadioManager  # noqa
+from cflib.drivers import crazyradio
+from cflib.drivers.crazyradio import Crazyradio
+
+
+class LinkDriver(ABC):
+    """Access to the Crazyradio dongles. Implemented by the cflib driver, or
+    by a fake driver to run without hardware.
+    """
+
+    @abstractmethod
+    def countDongles(self) -> int:
+        """Returns the number of Crazyradio dongles attached.
+
+        """
+
+    @abstractmethod
+    def ping(self, dongle: int, channel: int, dataRate: str,
+             address: int) -> bool:
+        """Send an empty packet and returns True if a drone acknowledged it.
+
+          @param dongle: the index of the dongle to send with.
+          @param channel: the radio channel.
+          @param dataRate: the data rate, 250K, 1M or 2M.
+          @param address: the radio address of the drone.
+        """
+
+    @abstractmethod
+    def scan(self, address: int) -> List:
+        """Look for the drone on every channel and data rate. Returns the
+        interfaces found, in the format of cflib.crtp.scan_interfaces.
+
+          @param address: the radio address of the drone.
+        """
+
+    @abstractmethod
+    def broadcast(self, dongle: int, channel: int, dataRate: str,
+                  packet: bytes) -> None:
+        """Send a packet to every drone listening on the broadcast address,
+        without retransmissions since no drone acknowledges it.
+
+          @param dongle: the index of the dongle to send with.
+          @param channel: the radio channel.
+          @param dataRate: the data rate, 250K, 1M or 2M.
+          @param packet: the crtp packet, header included.
+        """
+
+
+class CrazyradioLinkDriver(LinkDriver):
+    BROADCAST_ADDRESS = bytes((0xFF, 0xE7, 0xE7, 0xE7, 0xE7))
+    BROADCAST_REPEAT = 3
+    DATA_RATES: Dict[str, int] = {
+        '250K': Crazyradio.DR_250KPS,
+        '1M': Crazyradio.DR_1MPS,
+        '2M': Crazyradio.DR_2MPS,
+    }
+
+    def countDongles(self) -> int:
+        try:
+            return len(crazyradio.get_serials())
+        except OSError as e:
+            logging.warning(f'Could not list the Crazyradio dongles: {e}')
+            return 0
+
+    def ping(self, dongle: int, channel: int, dataRate: str,
+             address: int) -> bool:
+        radio = RadioManager.open(dongle)
+        try:
+            radio.set_channel(channel)
+            radio.set_data_rate(CrazyradioLinkDriver.DATA_RATES[dataRate])
+            radio.set_address(struct.pack('>Q', address)[3:])
+            ack = radio.send_packet((0xff,))
+            return ack is not None and ack.ack
+        finally:
+            radio.close()
+
+    def scan(self, address: int) -> List:
+        return cflib.crtp.scan_interfaces(address)
+
+    def broadcast(self, dongle: int, channel: int, dataRate: str,
+                  packet: bytes) -> None:
+        radio = RadioManager.open(dongle)
+        try:
+            radio.set_channel(channel)
+            radio.set_data_rate(CrazyradioLinkDriver.DATA_RATES[dataRate])
+            radio.set_address(CrazyradioLinkDriver.BROADCAST_ADDRESS)
+            # Nothing acknowledges a broadcast, so it is not retransmitted
+            # but repeated instead
+            radio.set_arc(0)
+            for _ in range(CrazyradioLinkDriver.BROADCAST_REPEAT):
+                radio.send_packet(packet)
+        finally:
+            # The retransmission count is a setting of the dongle, shared
+            # with the links of the drones
+            radio.set_arc(radiodriver._nr_of_arc_retries)  # noqa
+            radio.close()
+
+
+class FakeLinkDriver(LinkDriver):
+    """Link driver without hardware, answering for the drones placed on its
+    dongles. Records every ping and broadcast it receives.
+    """
+
+    def __init__(self, dongleCount: int,
+                 drones: Dict[int, Tuple[int, int, str]]) -> None:
+        """Initialize the fake dongles.
+
+          @param dongleCount: the number of dongles attached.
+          @param drones: the dongle, channel and data rate of every drone,
+          by address.
+        """
+        self.dongleCount = dongleCount
+        self.drones = drones
+        self.pings: List[Tuple[int, int, str, int]] = []
+        self.broadcasts: List[Tuple[int, int, str, bytes]] = []
+
+    def countDongles(self) -> int:
+        return self.dongleCount
+
+    def ping(self, dongle: int, channel: int, dataRate: str,
+             address: int) -> bool:
+        self.pings.append((dongle, channel, dataRate, address))
+        return self.drones.get(address) == (dongle, channel, dataRate)
+
+    def scan(self, address: int) -> List:
+        if address not in self.drones or not self.dongleCount:
+            return []
+        dongle, channel, dataRate = self.drones[address]
+        return [[f'radio://0/{channel}/{dataRate}/{address:X}', '']]
+
+    def broadcast(self, dongle: int, channel: int, dataRate: str,
+                  packet: bytes) -> None:
+        self.broadcasts.append((dongle, channel, dataRate, packet))
+
+
+class RadioShards:
+    """Spread the drones across every attached dongle. A drone is always
+    assigned to the same dongle, chosen from its address, and optionally to
+    a radio channel dedicated to that dongle. A drone missing from its
+    assigned dongle and channel can be looked for on every channel and data
+    rate, like cflib.crtp.scan_interfaces does.
+    """
+    CHANNEL = 80
+    CHANNEL_STEP = 10
+    DATA_RATE = '2M'
+
+    def __init__(self, linkDriver: LinkDriver,
+                 channelPerDongle: bool = False, channel: int = CHANNEL,
+                 dataRate: str = DATA_RATE, fullScan: bool = True) -> None:
+        """Initialize the shards. No dongle is known until detectDongles is
+        called.
+
+          @param linkDriver: the driver used to reach the dongles.
+          @param channelPerDongle: whether each dongle uses its own channel.
+          @param channel: the radio channel of the first dongle.
+          @param dataRate: the data rate of the drones, 250K, 1M or 2M.
+          @param fullScan: whether to scan every channel and data rate for
+          the drones not found on their assigned dongle.
+        """
+        self.linkDriver = linkDriver
+        self.channelPerDongle = channelPerDongle
+        self.channel = channel
+        self.dataRate = dataRate
+        self.fullScan = fullScan
+        self.dongleCount = 0
+
+    def detectDongles(self) -> int:
+        """Count the attached dongles and returns that count.
+
+        """
+        self.dongleCount = self.linkDriver.countDongles()
+        return self.dongleCount
+
+    def getDongle(self, address: int) -> int:
+        """Returns the index of the dongle assigned to the address.
+
+          @param address: the radio address of the drone.
+        """
+        return address % max(self.dongleCount, 1)
+
+    def getChannel(self, dongle: int) -> int:
+        """Returns the radio channel used by the dongle.
+
+          @param dongle: the index of the dongle.
+        """
+        if not self.channelPerDongle:
+            return self.channel
+        return self.channel + dongle * RadioShards.CHANNEL_STEP
+
+    def getUri(self, address: int) -> str:
+        """Returns the uri of the drone on its assigned dongle and channel.
+
+          @param address: the radio address of the drone.
+        """
+        dongle = self.getDongle(address)
+        return f'radio://{dongle}/{self.getChannel(dongle)}/' \
+               f'{self.dataRate}/{address:X}'
+
+    def probe(self, address: int) -> List:
+        """Look for the drone on its assigned dongle, then on every channel
+        and data rate if fullScan is set. Returns the interfaces found, in the
+        format of cflib.crtp.scan_interfaces.
+
+          @param address: the radio address of the drone.
+        """
+        dongle = self.getDongle(address)
+        if self.linkDriver.ping(dongle, self.getChannel(dongle),
+                                self.dataRate, address):
+            return [[self.getUri(address), '']]
+        if self.fullScan:
+            return self.linkDriver.scan(address)
+        return []
+
+    def broadcast(self, packet: bytes) -> None:
+        """Send a packet to every drone of the fleet at once, on every dongle
+        and its channel.
+
+          @param packet: the crtp packet, header included.
+        """
+        for dongle in range(self.dongleCount):
+            self.linkDriver.broadcast(dongle, self.getChannel(dongle),
+                                      self.dataRate, packet)
@@ -0,0 +1,71 @@
+from typing import Iterable, Optional, Set
+
+from src.models.message import Message, MessageSource
+
+
+class TopicFilter:
+    """Topics a dashboard subscribed to. The drones messages match the topic
+    of their source, 'argos' or 'crazyradio', or the topic of the drone,
+    'drone:<name>'. The missions messages match 'missions' and the build logs
+    match 'logs'. The other messages are always sent.
+    """
+    DEFAULT_TOPICS = {'argos', 'crazyradio', 'missions', 'logs'}
+    DRONE_TYPES = {'pulse', 'pulses', 'disconnect'}
+    MISSION_TYPES = {'mission', 'missionPulse'}
+    LOG_TYPES = {'loadProjectLog', 'flashProgress'}
+
+    def __init__(self) -> None:
+        """Initialize a filter letting every message through until the first
+        subscription.
+
+        """
+        self.topics: Optional[Set[str]] = None
+
+    def subscribe(self, topics: Iterable[str]) -> None:
+        """Add topics to the subscriptions. The first subscription replaces
+        the default topics, so that a dashboard subscribing to a few drones
+        only receives those.
+
+          @param topics: the topics to subscribe to.
+        """
+        if self.topics is None:
+            self.topics = set()
+        self.topics.update(topics)
+
+    def unsubscribe(self, topics: Iterable[str]) -> None:
+        """Remove topics from the subscriptions.
+
+          @param topics: the topics to unsubscribe from.
+        """
+        if self.topics is None:
+            self.topics = set(TopicFilter.DEFAULT_TOPICS)
+        self.topics.difference_update(topics)
+
+    def filter(self, message: Message,
+               source: Optional[MessageSource]) -> Optional[Message]:
+        """Returns the message if it matches the subscriptions, a pulses
+        message with only the matching drones, or None if nothing matches.
+
+          @param message: the message to filter.
+          @param source: the controller the message comes from, if any.
+        """
+        topics = self.topics
+        if topics is None:
+            return message
+        messageType = message['type']
+        if messageType in TopicFilter.MISSION_TYPES:
+            return message if 'missions' in topics else None
+        if messageType in TopicFilter.LOG_TYPES:
+            return message if 'logs' in topics else None
+        if messageType not in TopicFilter.DRONE_TYPES or source in topics:
+            return message
+        if messageType != 'pulses':
+            name = message['data']['name']
+            return message if f'drone:{name}' in topics else None
+        diffs = [diff for diff in message['data']
+                 if f'drone:{diff["name"]}' in topics]
+        if not diffs:
+            return None
+        if len(diffs) == len(message['data']):
+            return message
+        return Message(**{**message, 'data': diffs})
@@ -0,0 +1,166 @@
+import heapq
+import itertools
+import logging
+import time
+from enum import IntEnum
+from threading import Condition, Thread
+from typing import Callable, Dict, List, Optional, TypedDict
+
+
+class CommandPriority(IntEnum):
+    SAFETY = 0
+    MISSION = 1
+    COSMETIC = 2
+
+
+COMMAND_PRIORITIES: Dict[str, CommandPriority] = {
+    'land': CommandPriority.SAFETY,
+    'stopMission': CommandPriority.SAFETY,
+    'returnToBase': CommandPriority.SAFETY,
+    'startMission': CommandPriority.MISSION,
+    'takeOff': CommandPriority.MISSION,
+    'lighten': CommandPriority.COSMETIC,
+    'darken': CommandPriority.COSMETIC,
+}
+
+TOGGLE_COMMANDS = {'lighten', 'darken'}
+
+
+class CommandLatency(TypedDict):
+    count: int
+    average: float
+    max: float
+
+
+class UplinkScheduler:
+    """Send the commands of a drone from a dedicated thread, by priority.
+    Safety commands jump ahead of every other pending command and cancel the
+    pending mission commands, so that a landing drone never takes off again
+    afterwards. Cosmetic commands are rate limited, and a pending toggle is
+    replaced by the next one since only the last state matters.
+    """
+    COSMETIC_INTERVAL = 0.2
+
+    def __init__(self, name: str, send: Callable[[bytes], None]) -> None:
+        """Initialize the scheduler and start its thread.
+
+          @param name: the name of the drone, for the logs.
+          @param send: the function sending a payload to the drone.
+        """
+        self.name = name
+        self.send = send
+        self.condition = Condition()
+        self.heap: List[list] = []
+        self.sequence = itertools.count()
+        self.pendingToggle: Optional[list] = None
+        self.lastCosmeticSentAt = -UplinkScheduler.COSMETIC_INTERVAL
+        self.latencies: Dict[str, List[float]] = {}
+        self.running = True
+        self.thread = Thread(target=self.work, daemon=True)
+        self.thread.start()
+
+    def schedule(self, commandType: str, payload: bytes) -> None:
+        """Queue a command. Never blocks.
+
+          @param commandType: the type of the command.
+          @param payload: the bytes to send.
+        """
+        with self.condition:
+            now = time.monotonic()
+            if commandType in TOGGLE_COMMANDS and \
+                    self.pendingToggle is not None:
+                self.pendingToggle[3] = commandType
+                self.pendingToggle[4] = payload
+                return
+            priority = COMMAND_PRIORITIES.get(commandType,
+                                              CommandPriority.MISSION)
+            if priority == CommandPriority.SAFETY:
+                self.dropMissionCommands(commandType)
+            entry = [priority, next(self.sequence), now, commandType, payload]
+            if commandType in TOGGLE_COMMANDS:
+                self.pendingToggle = entry
+            heapq.heappush(self.heap, entry)
+            self.condition.notify()
+
+    def dropMissionCommands(self, commandType: str) -> None:
+        """Remove the pending mission commands, overridden by a safety
+        command. Must be called with the condition held.
+
+          @param commandType: the type of the safety command.
+        """
+        dropped = [entry[3] for entry in self.heap
+                   if entry[0] == CommandPriority.MISSION]
+        if not dropped:
+            return
+        self.heap = [entry for entry in self.heap
+                     if entry[0] != CommandPriority.MISSION]
+        heapq.heapify(self.heap)
+        logging.info(f'[{self.name}] {commandType} cancels the pending '
+                     f'{", ".join(dropped)}')
+
+    def work(self) -> None:
+        """Send the pending commands by priority until the scheduler stops.
+
+        """
+        while True:
+            with self.condition:
+                entry = self.nextCommand()
+                if entry is None:
+                    return
+                if entry is self.pendingToggle:
+                    self.pendingToggle = None
+            priority, sequence, enqueuedAt, commandType, payload = entry
+            try:
+                self.send(payload)
+            except Exception as e:  # noqa
+                logging.error(
+                    f'[{self.name}] Failed to send {commandType}: {e}')
+                continue
+            sentAt = time.monotonic()
+            with self.condition:
+                if priority == CommandPriority.COSMETIC:
+                    self.lastCosmeticSentAt = sentAt
+                self.latencies.setdefault(commandType, [0, 0.0, 0.0])
+                stats = self.latencies[commandType]
+                stats[0] += 1
+                stats[1] += sentAt - enqueuedAt
+                stats[2] = max(stats[2], sentAt - enqueuedAt)
+
+    def nextCommand(self) -> Optional[list]:
+        """Wait for the next command allowed to be sent and remove it from the
+        queue. Returns None once the scheduler stops. Must be called with the
+        condition held.
+
+        """
+        while self.running:
+            if not self.heap:
+                self.condition.wait()
+                continue
+            if self.heap[0][0] == CommandPriority.COSMETIC:
+                delay = self.lastCosmeticSentAt + \
+                    UplinkScheduler.COSMETIC_INTERVAL - time.monotonic()
+                if delay > 0:
+                    self.condition.wait(delay)
+                    continue
+            return heapq.heappop(self.heap)
+        return None
+
+    def getLatencies(self) -> Dict[str, CommandLatency]:
+        """Returns the send latency of every type of command, in seconds.
+
+        """
+        with self.condition:
+            return {
+                commandType: CommandLatency(
+                    count=count, average=total / count, max=maximum)
+                for commandType, (count, total, maximum)
+                in self.latencies.items()
+            }
+
+    def stop(self) -> None:
+        """Stop the thread. Pending commands are not sent.
+
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify()
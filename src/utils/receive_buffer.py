@@ -0,0 +1,84 @@
+import socket
+from typing import List, Optional
+
+
+class ReceiveBuffer:
+    """Accumulate the bytes read on a stream socket and split them into
+    complete frames. Incomplete frames are kept until the next read.
+    """
+
+    def __init__(self, readSize: int = 65536) -> None:
+        """Preallocate the memory used to read from the socket.
+
+          @param readSize: the maximum number of bytes read in one call.
+        """
+        self.readSize = readSize
+        self.__chunk = bytearray(readSize)
+        self.__chunkView = memoryview(self.__chunk)
+        self.__pending = bytearray()
+
+    def recvFrom(self, clientSocket: socket.socket) -> int:
+        """Read once from the socket and append the bytes to the pending
+        data. Returns the number of bytes read, 0 meaning the peer closed
+        the connection.
+
+          @param clientSocket: the socket to read from.
+        """
+        nBytes = clientSocket.recv_into(self.__chunkView, self.readSize)
+        if nBytes:
+            self.__pending += self.__chunkView[:nBytes]
+        return nBytes
+
+    def feed(self, data: bytes) -> None:
+        """Append already received bytes to the pending data.
+
+          @param data: the bytes to append.
+        """
+        self.__pending += data
+
+    def popLines(self) -> List[bytes]:
+        """Remove and return every complete newline-terminated line. Empty
+        lines are skipped and the trailing partial line is kept.
+        """
+        end = self.__pending.rfind(b'\n')
+        if end == -1:
+            return []
+        lines = bytes(self.__pending[:end]).split(b'\n')
+        del self.__pending[:end + 1]
+        return [line for line in lines if line.strip()]
+
+    def popLine(self) -> Optional[bytes]:
+        """Remove and return the first complete line, or None if there is
+        none yet.
+        """
+        end = self.__pending.find(b'\n')
+        if end == -1:
+            return None
+        line = bytes(self.__pending[:end])
+        del self.__pending[:end + 1]
+        return line
+
+    def peek(self, size: int) -> Optional[bytes]:
+        """Return the first bytes without removing them, or None if fewer
+        bytes are pending.
+
+          @param size: the number of bytes to return.
+        """
+        if len(self.__pending) < size:
+            return None
+        return bytes(self.__pending[:size])
+
+    def popFrame(self, size: int) -> Optional[bytes]:
+        """Remove and return a frame of the given size, or None if it isn't
+        complete yet.
+
+          @param size: the size in bytes of the frame.
+        """
+        if len(self.__pending) < size:
+            return None
+        frame = bytes(self.__pending[:size])
+        del self.__pending[:size]
+        return frame
+
+    def __len__(self) -> int:
+        return len(self.__pending)
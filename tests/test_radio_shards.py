@@ -0,0 +1,100 @@
+import unittest
+
+from src.services.radio_shards import FakeLinkDriver, LinkDriver, RadioShards
+
+FIRST_DRONE_ADDRESS = 0xE7E7E7E701
+
+
+class RadioShardsTest(unittest.TestCase):
+    N_DONGLES = 3
+    N_DRONES = 30
+
+    def setUp(self) -> None:
+        self.addresses = range(FIRST_DRONE_ADDRESS,
+                               FIRST_DRONE_ADDRESS + RadioShardsTest.N_DRONES)
+
+    def makeShards(self, channelPerDongle: bool, **kwargs) -> RadioShards:
+        """Place every drone on its assigned dongle and channel, and one
+        more drone on another channel and data rate.
+        """
+        placement = RadioShards(
+            FakeLinkDriver(RadioShardsTest.N_DONGLES, {}), channelPerDongle)
+        placement.detectDongles()
+        drones = {}
+        for address in self.addresses:
+            dongle = placement.getDongle(address)
+            drones[address] = (dongle, placement.getChannel(dongle), '2M')
+        drones[self.addresses.stop] = (0, 20, '250K')
+        self.driver = FakeLinkDriver(RadioShardsTest.N_DONGLES, drones)
+        shards = RadioShards(self.driver, channelPerDongle, **kwargs)
+        shards.detectDongles()
+        return shards
+
+    def testLinkDriverIsAbstract(self) -> None:
+        with self.assertRaises(TypeError):
+            LinkDriver()
+
+    def testDetectDongles(self) -> None:
+        shards = self.makeShards(False)
+        self.assertEqual(shards.dongleCount, RadioShardsTest.N_DONGLES)
+
+    def testGetDongle(self) -> None:
+        shards = self.makeShards(False)
+        for address in self.addresses:
+            self.assertEqual(shards.getDongle(address),
+                             address % RadioShardsTest.N_DONGLES)
+        self.assertEqual(
+            set(map(shards.getDongle, self.addresses)),
+            set(range(RadioShardsTest.N_DONGLES)))
+
+    def testGetDongleWithoutDongle(self) -> None:
+        shards = RadioShards(FakeLinkDriver(0, {}))
+        shards.detectDongles()
+        self.assertEqual(shards.getDongle(FIRST_DRONE_ADDRESS), 0)
+
+    def testGetChannel(self) -> None:
+        shared = self.makeShards(False)
+        perDongle = self.makeShards(True)
+        for dongle in range(RadioShardsTest.N_DONGLES):
+            self.assertEqual(shared.getChannel(dongle), 80)
+            self.assertEqual(perDongle.getChannel(dongle), 80 + dongle * 10)
+
+    def testGetChannelConfigured(self) -> None:
+        shards = RadioShards(FakeLinkDriver(2, {}), True, channel=40)
+        self.assertEqual(shards.getChannel(1), 50)
+
+    def testProbeAssignedDongle(self) -> None:
+        for channelPerDongle in (False, True):
+            shards = self.makeShards(channelPerDongle)
+            for address in self.addresses:
+                dongle = shards.getDongle(address)
+                channel = shards.getChannel(dongle)
+                self.assertEqual(
+                    shards.probe(address),
+                    [[f'radio://{dongle}/{channel}/2M/{address:X}', '']])
+            self.assertEqual(self.driver.pings, [
+                (shards.getDongle(address),
+                 shards.getChannel(shards.getDongle(address)), '2M', address)
+                for address in self.addresses])
+
+    def testProbeFullScan(self) -> None:
+        shards = self.makeShards(False)
+        address = self.addresses.stop
+        self.assertEqual(shards.probe(address),
+                         [[f'radio://0/20/250K/{address:X}', '']])
+        self.assertEqual(shards.probe(address + 1), [])
+
+    def testProbeWithoutFullScan(self) -> None:
+        shards = self.makeShards(False, fullScan=False)
+        self.assertEqual(shards.probe(self.addresses.stop), [])
+
+    def testBroadcast(self) -> None:
+        shards = self.makeShards(True)
+        shards.broadcast(b'\xde\x01')
+        self.assertEqual(self.driver.broadcasts, [
+            (dongle, 80 + dongle * 10, '2M', b'\xde\x01')
+            for dongle in range(RadioShardsTest.N_DONGLES)])
+
+
+if __name__ == '__main__':
+    unittest.main()